@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from panda3d.core import ConfigVariableInt, ConfigVariableString
+from panda3d.core import NodePath
+
+
+bam_cache_dir = ConfigVariableString(
+    'bam-cache-dir', 'bam_cache',
+    'The directory in which generated models are cached as bam files.'
+)
+
+bam_cache_size = ConfigVariableInt(
+    'bam-cache-size', 1024 * 1024 * 1024,
+    'The maximum total number of bytes of the bam files in bam-cache-dir.'
+)
+
+
+def get_shapes_version():
+    """Returns the commit of the shapes submodule. If the submodule has local changes,
+       the hash of the diff is appended so that the cache is not reused for stale models.
+    """
+    shapes_dir = Path(__file__).parent / 'shapes'
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=shapes_dir, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+        diff = subprocess.run(
+            ['git', 'diff', 'HEAD'],
+            cwd=shapes_dir, capture_output=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+    if diff:
+        commit += '+' + hashlib.sha256(diff).hexdigest()[:16]
+
+    return commit
+
+
+class BamCache:
+    """A disk cache of flattened models stored as bam streams in .bam files.
+       Each bam file has a sidecar file holding its sha256 digest,
+       which is checked before the model is loaded.
+        Args:
+            cache_dir (str): the directory of the cache.
+            max_bytes (int): the least recently used files are removed
+                             when the total size exceeds this.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = Path(bam_cache_dir.get_value() if cache_dir is None else cache_dir)
+        self.max_bytes = bam_cache_size.get_value() if max_bytes is None else max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.version = get_shapes_version()
+        # One thread, so that the files are written in the order of the requests.
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def make_key(self, model_name, params):
+        """Args:
+            model_name (str): a key of SHAPES.
+            params (dict): the result of model_dump() of a validator.
+        """
+        source = json.dumps([model_name, sorted(params.items()), self.version])
+        return hashlib.sha256(source.encode()).hexdigest()
+
+    def get_paths(self, key):
+        bam_path = self.cache_dir / f'{key}.bam'
+        digest_path = self.cache_dir / f'{key}.sha256'
+        return bam_path, digest_path
+
+    def get(self, key):
+        """Returns the cached model, or None if not cached or the file is broken.
+        """
+        bam_path, digest_path = self.get_paths(key)
+
+        try:
+            data = bam_path.read_bytes()
+            digest = digest_path.read_text()
+        except OSError:
+            return None
+
+        if hashlib.sha256(data).hexdigest() != digest:
+            self.remove(key)
+            return None
+
+        # The files are bam streams, the same as sent by the build process, not bam files.
+        # Files written as bam files by older versions cannot be decoded and are removed.
+        try:
+            model = NodePath.decode_from_bam_stream(data)
+        except AssertionError:
+            model = NodePath()
+
+        if model.is_empty():
+            self.remove(key)
+            return None
+
+        # Update the modification time, which is used to find least recently used files.
+        os.utime(bam_path)
+        return model
+
+    def put(self, key, data):
+        """Write the bam stream of a flattened model to the cache.
+        """
+        bam_path, digest_path = self.get_paths(key)
+        tmp_path = bam_path.with_suffix('.tmp')
+
+        try:
+            tmp_path.write_bytes(data)
+            # The digest is written first, so that get does not find the bam file without it.
+            digest_path.write_text(hashlib.sha256(data).hexdigest())
+            os.replace(tmp_path, bam_path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        self.evict()
+
+    def put_async(self, key, model=None, data=None):
+        """Write the model to the cache in a background thread, so that the render loop is
+           not blocked. The model is encoded in the thread if its bam stream is not given.
+            Args:
+                model (NodePath): a flattened model.
+                data (bytes): the bam stream of the model, e.g. sent by the build process.
+        """
+        if data is None:
+            # The copy shares the geometry, and keeps the model as it is now even if
+            # its transform or render state is changed while being encoded.
+            copy = model.copy_to(NodePath())
+            self.executor.submit(lambda: self.put(key, copy.encode_to_bam_stream()))
+        else:
+            self.executor.submit(self.put, key, data)
+
+    def close(self):
+        """Wait for the files being written.
+        """
+        self.executor.shutdown()
+
+    def remove(self, key):
+        for path in self.get_paths(key):
+            path.unlink(missing_ok=True)
+
+    def evict(self):
+        """Remove the least recently used files until the total size is within max_bytes.
+        """
+        files = sorted(self.cache_dir.glob('*.bam'), key=lambda path: path.stat().st_mtime)
+        total = sum(path.stat().st_size for path in files)
+
+        for path in files:
+            if total <= self.max_bytes:
+                break
+
+            total -= path.stat().st_size
+            self.remove(path.stem)
@@ -0,0 +1,203 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+from panda3d.core import Filename
+from pydantic import ValidationError
+
+from budget import check_budget
+from builder import create_model
+from optimize import compact_model
+from pack import PackWriter
+from shape_registry import SHAPES, validate, format_errors
+
+
+# errors: the messages of a spec line which cannot be read; the job is reported as invalid without being built.
+Job = namedtuple('Job', ['index', 'model_name', 'params', 'output', 'errors'], defaults=[None])
+
+
+def build_job(job, compact=False):
+    """Validate the parameters of the job, check them against the budget and create the model.
+       Returns a dict of the result and the model, which is None if it cannot be built.
+        Args:
+            job (Job): the model to be built.
+            compact (bool): if True, the model is converted by optimize.compact_model.
+    """
+    result = dict(index=job.index, shape=job.model_name, output=job.output)
+
+    if job.errors:
+        return result | dict(status='invalid', errors=job.errors), None
+
+    try:
+        params = validate(job.model_name, job.params)
+    except ValidationError as e:
+        return result | dict(status='invalid', errors=format_errors(e)), None
+
+    if errors := check_budget(job.model_name, params):
+        return result | dict(status='rejected', errors=errors), None
+
+    model = create_model(job.model_name, params)
+
+    if compact:
+        compact_model(model)
+
+    return result | dict(status='ok', params=params), model
+
+
+def generate(job, compact=False):
+    """Build the model with build_job and write it to a bam file.
+       Returns a dict of the result, which can be output as a json line.
+    """
+    start = time.perf_counter()
+    result, model = build_job(job, compact)
+
+    if model is None:
+        return result
+
+    if not model.write_bam_file(Filename.from_os_specific(job.output)):
+        return result | dict(status='error', errors=[f'cannot write {job.output}'])
+
+    return result | dict(time=time.perf_counter() - start)
+
+
+def generate_data(job, compact=False):
+    """Build the model like generate, but return it as a bam stream in the result
+       instead of writing it to a file, so that the main process can add it to a pack file.
+    """
+    start = time.perf_counter()
+    result, model = build_job(job, compact)
+
+    if model is None:
+        return result
+
+    data = model.encode_to_bam_stream()
+    return result | dict(time=time.perf_counter() - start, data=data)
+
+
+def write_to_pack(results, writer):
+    """Add the models in the results of generate_data to the pack file as they come,
+       and yield the results without the bam streams.
+        Args:
+            results (iterable): dicts returned by run_jobs.
+            writer (PackWriter): the pack file to write.
+    """
+    for result in results:
+        if (data := result.pop('data', None)) is not None:
+            try:
+                writer.add(result['output'], data, shape=result['shape'], params=result['params'])
+            except ValueError as e:
+                result |= dict(status='error', errors=[str(e)])
+
+        yield result
+
+
+def run_jobs(jobs, func=generate, max_workers=None):
+    """Run jobs in worker processes and yield their results as they finish.
+       Jobs are submitted gradually, so that a huge number of jobs are not held in the queue.
+        Args:
+            jobs (iterable): jobs passed to func.
+            func (callable): a picklable function which returns a dict.
+            max_workers (int): the number of processes; if None, the number of cores.
+    """
+    max_workers = max_workers or os.cpu_count()
+    jobs = iter(jobs)
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            for job in jobs:
+                running[executor.submit(func, job)] = job
+                if len(running) >= max_workers * 2:
+                    break
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                job = running.pop(future)
+
+                if (e := future.exception()) is not None:
+                    yield dict(index=job.index, shape=job.model_name, output=job.output,
+                               status='error', errors=[f'{type(e).__name__}: {e}'])
+                else:
+                    yield future.result()
+
+
+def read_spec(spec_file, output_dir):
+    """Yield jobs from a json lines file. Each line is like
+       {"shape": "torus", "params": {"segs_r": 100}, "output": "torus_100.bam"}.
+       "params" and "output" are optional; relative output paths are joined to output_dir.
+       A line which cannot be read is yielded as a job with errors, so that it has its own result.
+    """
+    with open(spec_file, encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            if not (line := line.strip()):
+                continue
+
+            output = Path(output_dir) / f'line_{i + 1}.bam'
+
+            try:
+                spec = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield Job(i, None, {}, str(output), [f'line {i + 1}: Invalid JSON, {e.msg}.'])
+                continue
+
+            if not isinstance(spec, dict) or 'shape' not in spec:
+                yield Job(i, None, {}, str(output), [f'line {i + 1}: shape  Field required.'])
+                continue
+
+            model_name = spec['shape']
+
+            if model_name not in SHAPES:
+                yield Job(i, model_name, {}, str(output), [f'line {i + 1}: shape: {model_name}  Unknown shape.'])
+                continue
+
+            output = Path(output_dir) / spec.get('output', f'{model_name}_{i}.bam')
+            yield Job(i, model_name, spec.get('params', {}), str(output))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Validate and build models listed in a json lines file without opening a window.'
+    )
+    parser.add_argument('spec', help='a json lines file; one model per line')
+    parser.add_argument('-o', '--output-dir', default='.', help='the directory to write bam files')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='the number of worker processes')
+    parser.add_argument('-p', '--pack', help='write all the models to this pack file instead of bam files')
+    parser.add_argument('-c', '--compact', action='store_true',
+                        help='drop the color column, interleave the vertex columns and use 16-bit indices if possible')
+    args = parser.parse_args(argv)
+
+    failed = 0
+
+    with contextlib.ExitStack() as stack:
+        if args.pack:
+            # In a pack file, the file name without the extension is the name of the model.
+            writer = stack.enter_context(PackWriter(args.pack))
+            jobs = (job._replace(output=Path(job.output).stem) for job in read_spec(args.spec, ''))
+            func = partial(generate_data, compact=args.compact)
+            results = write_to_pack(run_jobs(jobs, func, args.jobs), writer)
+        else:
+            Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+            func = partial(generate, compact=args.compact)
+            results = run_jobs(read_spec(args.spec, args.output_dir), func, args.jobs)
+
+        for result in results:
+            if result['status'] != 'ok':
+                failed += 1
+            print(json.dumps(result), flush=True)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from bam_cache import get_shapes_version
+from geom_stats import calc_model_bytes, count_geometry
+from shape_registry import SHAPES, validate, get_default_params, get_segment_fields, scale_segments
+
+
+STEPS = ('validate', 'create', 'flatten', 'serialize')
+
+
+def run_steps(model_name, params):
+    """Run the steps of building the model.
+       Returns the model, its bam stream and {step: time}.
+    """
+    t0 = time.perf_counter()
+    validated_params = validate(model_name, params)
+    t1 = time.perf_counter()
+    model = SHAPES[model_name].model(**validated_params).create()
+    t2 = time.perf_counter()
+    model.flatten_strong()
+    t3 = time.perf_counter()
+    data = model.encode_to_bam_stream()
+    t4 = time.perf_counter()
+
+    return model, data, dict(zip(STEPS, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)))
+
+
+def measure(model_name, factor, repeat=3):
+    """Measure each step of building the model whose segment counts are
+       the defaults multiplied by factor. The fastest time of each step is recorded.
+       Returns a dict of the measurement.
+        Args:
+            model_name (str): a key of SHAPES.
+            factor (float): the scale of the segment counts.
+            repeat (int): the number of measurements.
+    """
+    params = scale_segments(model_name, get_default_params(model_name), factor)
+    times = {step: float('inf') for step in STEPS}
+
+    for _ in range(repeat):
+        _, _, step_times = run_steps(model_name, params)
+        times = {step: min(times[step], step_times[step]) for step in STEPS}
+
+    # The peak memory is measured in a separate pass, because tracing slows down the steps.
+    # tracemalloc only sees memory allocated through Python, e.g. numpy arrays,
+    # so the size of the geometry held by Panda3D is recorded separately.
+    tracemalloc.start()
+    model, data, _ = run_steps(model_name, params)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    vertices, triangles = count_geometry(model)
+
+    return dict(
+        shape=model_name,
+        factor=factor,
+        segments={name: params[name] for name in get_segment_fields(model_name)},
+        **times,
+        total=sum(times.values()),
+        peak_python_bytes=peak,
+        geometry_bytes=calc_model_bytes(model),
+        bam_bytes=len(data),
+        vertices=vertices,
+        triangles=triangles
+    )
+
+
+def compare(results, baseline, threshold, min_time=0.001):
+    """Returns a list of messages of the regressions from the baseline.
+        Args:
+            results (list): measurements.
+            baseline (list): measurements stored before.
+            threshold (float): a step regresses if it is slower than the baseline x threshold.
+            min_time (float): steps faster than this are ignored, because they are noisy.
+    """
+    base = {(item['shape'], item['factor']): item for item in baseline}
+    regressions = []
+
+    for item in results:
+        if (old := base.get((item['shape'], item['factor']))) is None:
+            continue
+
+        name = f"{item['shape']} x{item['factor']}"
+
+        for step in STEPS:
+            if item[step] >= min_time and item[step] > old[step] * threshold:
+                regressions.append(f'{name}: {step} {old[step]:.4f}s -> {item[step]:.4f}s')
+
+        for key in ('vertices', 'triangles'):
+            if item[key] != old[key]:
+                regressions.append(f'{name}: {key} {old[key]} -> {item[key]}')
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Measure how building each shape scales with its segment counts.'
+    )
+    parser.add_argument('-s', '--shapes', nargs='+', choices=SHAPES.keys(), default=[*SHAPES.keys()])
+    parser.add_argument('-f', '--factors', nargs='+', type=float, default=[1, 2, 4, 8],
+                        help='the scales of the default segment counts')
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', default='benchmark.json', help='the file to write the results')
+    parser.add_argument('-b', '--baseline', help='the results stored before, to detect regressions')
+    parser.add_argument('-t', '--threshold', type=float, default=1.25,
+                        help='a step regresses if it is slower than the baseline x threshold')
+    args = parser.parse_args(argv)
+
+    results = []
+
+    for model_name in args.shapes:
+        for factor in args.factors:
+            item = measure(model_name, factor, args.repeat)
+            print(f"{model_name:<20} x{factor:<5} vertices {item['vertices']:>9} "
+                  f"triangles {item['triangles']:>9} total {item['total']:.4f}s", flush=True)
+            results.append(item)
+
+    output = dict(
+        python=platform.python_version(),
+        platform=platform.platform(),
+        shapes_version=get_shapes_version(),
+        results=results
+    )
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+        if regressions := compare(results, baseline['results'], args.threshold):
+            print('\n'.join(['Regressions:', *regressions]))
+            return 1
+
+        print('No regressions.')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
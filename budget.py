@@ -0,0 +1,40 @@
+from panda3d.core import ConfigVariableInt, ConfigVariableInt64, ConfigVariableDouble
+
+from estimate import estimate
+
+
+max_model_vertices = ConfigVariableInt(
+    'max-model-vertices', 20_000_000,
+    'Models estimated to have more vertices than this are not built; 0 means no limit.'
+)
+
+max_model_memory = ConfigVariableInt64(
+    'max-model-memory', 2 * 1024 ** 3,
+    'The bytes a model can use. Models estimated to be larger are not built, and the build '
+    'process cannot allocate more than this; 0 means no limit.'
+)
+
+max_build_time = ConfigVariableDouble(
+    'max-build-time', 60.0,
+    'Builds taking more seconds than this are cancelled; 0 means no limit.'
+)
+
+
+def check_budget(model_name, params):
+    """Returns a list of the messages of the budgets which the model is estimated to exceed.
+       The list is empty if the model can be built.
+        Args:
+            model_name (str): a key of SHAPES.
+            params (dict): validated parameters.
+    """
+    est = estimate(model_name, params)
+    errors = []
+
+    if (limit := max_model_vertices.get_value()) and est.vertices > limit:
+        errors.append(f'{model_name}: about {est.vertices:,} vertices exceeds the budget of {limit:,} vertices.')
+
+    if (limit := max_model_memory.get_value()) and est.bytes > limit:
+        errors.append(f'{model_name}: about {est.bytes / 1024 ** 2:,.0f} MB exceeds '
+                      f'the budget of {limit / 1024 ** 2:,.0f} MB.')
+
+    return errors
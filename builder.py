@@ -0,0 +1,200 @@
+import importlib
+import multiprocessing
+import time
+from collections import namedtuple
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where the memory of the worker is not limited.
+    resource = None
+
+from panda3d.core import NodePath
+
+from shape_registry import SHAPES
+
+
+BuildResult = namedtuple('BuildResult', ['model_name', 'params', 'data', 'error', 'build_time'])
+
+
+def create_model(model_name, params):
+    """Create a model from validated parameters.
+        Args:
+            model_name (str): a key of SHAPES.
+            params (dict): validated parameters.
+    """
+    shape = SHAPES[model_name]
+    model = shape.model(**params).create()
+    model.flatten_strong()
+    return model
+
+
+def build_model(model_name, params):
+    """Create a model and return it serialized as a bam stream,
+       so that it can be passed between processes.
+    """
+    model = create_model(model_name, params)
+    return model.encode_to_bam_stream()
+
+
+def decode_model(data):
+    return NodePath.decode_from_bam_stream(data)
+
+
+def limit_memory(max_bytes):
+    """Limit the address space of this process to its current size plus max_bytes,
+       so that a huge model raises MemoryError or kills only this process.
+       Nothing is done if max_bytes is 0 or the platform is not Linux, which has
+       /proc/self/statm; macOS, for example, does not enforce RLIMIT_AS.
+    """
+    if resource is None or not max_bytes:
+        return
+
+    try:
+        with open('/proc/self/statm') as f:
+            size = int(f.read().split()[0]) * resource.getpagesize()
+    except OSError:
+        return
+
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    soft = size + max_bytes
+
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+
+    resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def serve(conn, memory_limit=0):
+    """Build models requested through the pipe until it is closed.
+        Args:
+            conn (multiprocessing.connection.Connection): the worker side of the pipe.
+            memory_limit (int): the bytes the worker can allocate in addition to its size at startup.
+    """
+    # The shapes and the libraries they use are loaded before the memory is limited,
+    # because mapping shared libraries also takes the address space.
+    importlib.import_module('shapes')
+    limit_memory(memory_limit)
+
+    while True:
+        try:
+            model_name, params = conn.recv()
+        except EOFError:
+            break
+
+        start = time.perf_counter()
+
+        try:
+            data = build_model(model_name, params)
+        except MemoryError:
+            conn.send((None, 'The build ran out of the memory budget.', time.perf_counter() - start))
+        except Exception as e:
+            conn.send((None, f'{type(e).__name__}: {e}', time.perf_counter() - start))
+        else:
+            conn.send((data, None, time.perf_counter() - start))
+
+
+class ModelBuilder:
+    """Build models in a worker process so that the render loop is not blocked.
+       Only one build runs at a time; submitting a new one terminates the
+       superseded build and restarts the worker.
+        Args:
+            memory_limit (int): the bytes the worker can allocate; 0 means no limit.
+            time_limit (float): seconds after which a build is cancelled; 0 means no limit.
+    """
+
+    def __init__(self, memory_limit=0, time_limit=0):
+        self.ctx = multiprocessing.get_context('spawn')
+        self.memory_limit = memory_limit
+        self.time_limit = time_limit
+        self.process = None
+        self.conn = None
+        self.job = None
+        self.start_time = 0
+
+    @property
+    def is_building(self):
+        return self.job is not None
+
+    @property
+    def elapsed(self):
+        """Seconds since the running build was submitted."""
+        return time.perf_counter() - self.start_time if self.job is not None else 0
+
+    def start(self):
+        self.conn, child_conn = self.ctx.Pipe()
+        self.process = self.ctx.Process(target=serve, args=(child_conn, self.memory_limit), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def submit(self, model_name, params):
+        """Start building a model. A build still running is cancelled.
+            Args:
+                model_name (str): a key of SHAPES.
+                params (dict): validated parameters.
+        """
+        if self.job is not None:
+            self.cancel()
+
+        if self.process is None:
+            self.start()
+
+        self.conn.send((model_name, params))
+        self.job = (model_name, params)
+        self.start_time = time.perf_counter()
+
+    def cancel(self):
+        """Cancel the running build by terminating the worker process.
+           A new worker is started on the next submit.
+        """
+        if self.job is None:
+            return
+
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+        self.job = None
+
+    def poll(self):
+        """Returns BuildResult if the build has finished or has been cancelled
+           for exceeding time_limit, otherwise None.
+        """
+        if self.job is None:
+            return None
+
+        if not self.conn.poll():
+            if not self.time_limit or (elapsed := self.elapsed) < self.time_limit:
+                return None
+
+            model_name, params = self.job
+            self.cancel()
+            error = f'The build was cancelled after {elapsed:.1f} seconds; the time budget is {self.time_limit:g} seconds.'
+            return BuildResult(model_name, params, None, error, elapsed)
+
+        model_name, params = self.job
+        self.job = None
+
+        try:
+            data, error, build_time = self.conn.recv()
+        except (EOFError, OSError):
+            # The worker process died, e.g. killed by the OS for running out of memory.
+            self.process.join()
+            self.conn.close()
+            self.process = None
+            self.conn = None
+            build_time = time.perf_counter() - self.start_time
+            return BuildResult(model_name, params, None, 'The build process exited unexpectedly.', build_time)
+
+        return BuildResult(model_name, params, data, error, build_time)
+
+    def shutdown(self):
+        self.cancel()
+
+        if self.process is not None:
+            self.conn.close()
+            self.process.join()
+            self.process = None
+            self.conn = None
+            self.job = None
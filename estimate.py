@@ -0,0 +1,106 @@
+from collections import namedtuple
+
+
+Estimate = namedtuple('Estimate', ['vertices', 'triangles', 'bytes'])
+
+
+# The bytes per vertex of GeomVertexFormat.get_v3n3c4t2(): vertex, normal, color and texcoord.
+VERTEX_BYTES = 36
+
+
+def grid(u, v):
+    """Returns the numbers of the vertices and triangles of a surface divided into u x v quads.
+    """
+    return (u + 1) * (v + 1), 2 * u * v
+
+
+def add(*surfaces):
+    return tuple(map(sum, zip(*surfaces))) if surfaces else (0, 0)
+
+
+def twice_if(hollow, surface):
+    """A hollow shape has the inner surface as well as the outer one.
+    """
+    return add(surface, surface) if hollow else surface
+
+
+def estimate_prism(p, hollow, slice_deg):
+    """Cylinder, cone and elliptical prism: the side, the caps and the slice caps.
+    """
+    side = twice_if(hollow, grid(p['segs_c'], p['segs_a']))
+    caps = add(grid(p['segs_c'], p['segs_top_cap']), grid(p['segs_c'], p['segs_bottom_cap']))
+    slices = grid(p['slice_caps_radial'], p['slice_caps_axial']) if slice_deg else (0, 0)
+    return add(side, caps, slices, slices)
+
+
+def estimate_spherical(p, hollow):
+    """Sphere and ellipsoid: the surface, the clip caps and the slice caps.
+    """
+    surface = twice_if(hollow, grid(p['segs_h'], p['segs_v']))
+    top = grid(p['segs_h'], p['segs_top_cap']) if p['top_clip'] < 1 else (0, 0)
+    bottom = grid(p['segs_h'], p['segs_bottom_cap']) if p['bottom_clip'] > -1 else (0, 0)
+    slices = grid(p['segs_v'], p['segs_slice_caps']) if p['slice_deg'] else (0, 0)
+    return add(surface, top, bottom, slices, slices)
+
+
+def estimate_box(p, hollow):
+    w, d, z = p['segs_w'], p['segs_d'], p['segs_z']
+    faces = add(*[grid(w, d), grid(w, z), grid(d, z)] * 2)
+    return twice_if(hollow, faces)
+
+
+def estimate_torus(p):
+    surface = twice_if(p['section_inner_radius'], grid(p['segs_r'], p['segs_s']))
+    ring_caps = add(grid(p['segs_s'], p['ring_slice_start_cap']), grid(p['segs_s'], p['ring_slice_end_cap'])) \
+        if p['ring_slice_deg'] else (0, 0)
+    section_caps = add(grid(p['segs_r'], p['section_slice_start_cap']), grid(p['segs_r'], p['section_slice_end_cap'])) \
+        if p['section_slice_deg'] else (0, 0)
+    return add(surface, ring_caps, section_caps)
+
+
+def estimate_capsule(p):
+    # The hemispheres are divided like a sphere with segs_c around the axis.
+    side = grid(p['segs_c'], p['segs_a'])
+    hemispheres = grid(p['segs_c'], p['segs_c'] // 2)
+    slices = grid(p['slice_caps_radial'], p['slice_caps_axial']) if p['ring_slice_deg'] else (0, 0)
+    return add(twice_if(p['inner_radius'], add(side, hemispheres)), slices, slices)
+
+
+def estimate_triangle(p):
+    sides = add(*[grid(1, p['segs_a'])] * 3)
+    sides = twice_if(p['inner_adjacent'] or p['inner_opposite'], sides)
+    # A triangular cap divided into n rows has n * n triangles.
+    caps = ((p['segs_top_cap'] + 1) ** 2 + (p['segs_bottom_cap'] + 1) ** 2,
+            p['segs_top_cap'] ** 2 + p['segs_bottom_cap'] ** 2)
+    return add(sides, caps)
+
+
+ESTIMATORS = {
+    'cone': lambda p: estimate_prism(p, p['bottom_inner_radius'] or p['top_inner_radius'], p['slice_deg']),
+    'cylinder': lambda p: estimate_prism(p, p['inner_radius'], p['ring_slice_deg']),
+    'elliptical_prism': lambda p: estimate_prism(p, p['thickness'], p['ring_slice_deg']),
+    'sphere': lambda p: estimate_spherical(p, p['inner_radius']),
+    'ellipsoid': lambda p: estimate_spherical(p, p['thickness']),
+    'box': lambda p: estimate_box(p, p['thickness']),
+    'rounded_corner_box': lambda p: estimate_box(p, p['thickness']),
+    'rounded_edge_box': lambda p: estimate_box(p, p['thickness']),
+    'capsule_prism': lambda p: estimate_box(p, p['thickness']),
+    'torus': estimate_torus,
+    'capsule': estimate_capsule,
+    'triangle': estimate_triangle,
+    'plane': lambda p: grid(p['segs_w'], p['segs_d']),
+}
+
+
+def estimate(model_name, params, vertex_bytes=VERTEX_BYTES):
+    """Estimate the size of the model from the parameters without building it.
+       The counts are of the grids of the surfaces, so they are approximate,
+       but they grow with the segment counts as the model does.
+        Args:
+            model_name (str): a key of SHAPES.
+            params (dict): validated parameters.
+            vertex_bytes (int): the bytes per vertex of the vertex format.
+    """
+    vertices, triangles = ESTIMATORS[model_name](params)
+    index_bytes = 2 if vertices < 0x10000 else 4
+    return Estimate(vertices, triangles, vertices * vertex_bytes + triangles * 3 * index_bytes)
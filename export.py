@@ -0,0 +1,296 @@
+import argparse
+import json
+import struct
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+from panda3d.core import Filename, Loader, LoaderOptions, NodePath, Geom
+
+from batch import Job, run_jobs
+from geom_stats import iter_geom_nodes
+from optimize import optimize_model
+from pack import PackReader
+from vertex_arrays import get_column, get_indices
+
+
+# vertices, normals: float32 arrays of (n, 3); normals is None if the vertex data has no normals.
+# texcoords: float32 array of (n, 2) or None.
+# triangles: uint32 array of (the number of triangles, 3).
+Mesh = namedtuple('Mesh', ['name', 'vertices', 'normals', 'texcoords', 'triangles'])
+
+
+def get_vectors(vdata, name, size):
+    if (column := get_column(vdata, name)) is None:
+        return None
+
+    return np.ascontiguousarray(column[:, :size], dtype=np.float32)
+
+
+def get_triangles(geom):
+    """Returns the vertex indices of all the triangles of the geom as an array of (n, 3).
+       Triangle strips and fans are decomposed into triangles.
+    """
+    triangles = [
+        get_indices(prim.decompose()).reshape(-1, 3).astype(np.uint32)
+        for prim in geom.get_primitives()
+        if prim.get_primitive_type() == Geom.PT_polygons
+    ]
+    return np.concatenate(triangles) if triangles else np.empty((0, 3), dtype=np.uint32)
+
+
+def extract_meshes(model, name):
+    """Returns a list of Mesh, one per Geom of the model. The model is flattened
+       first, so that the transforms and colors are applied to the vertices.
+        Args:
+            model (NodePath): the model; it is not modified.
+            name (str): the base name of the meshes.
+    """
+    model = model.copy_to(NodePath(name))
+    model.flatten_strong()
+    meshes = []
+
+    for node in iter_geom_nodes(model):
+        for geom in node.get_geoms():
+            vdata = geom.get_vertex_data()
+            meshes.append(Mesh(
+                f'{name}_{len(meshes)}',
+                get_vectors(vdata, 'vertex', 3),
+                get_vectors(vdata, 'normal', 3),
+                get_vectors(vdata, 'texcoord', 2),
+                get_triangles(geom)
+            ))
+
+    return meshes
+
+
+def write_obj(meshes, filename):
+    with open(filename, 'w', encoding='utf-8') as f:
+        offset = 1
+
+        for mesh in meshes:
+            f.write(f'o {mesh.name}\n')
+            np.savetxt(f, mesh.vertices, fmt='v %.6g %.6g %.6g')
+
+            if mesh.texcoords is not None:
+                np.savetxt(f, mesh.texcoords, fmt='vt %.6g %.6g')
+            if mesh.normals is not None:
+                np.savetxt(f, mesh.normals, fmt='vn %.6g %.6g %.6g')
+
+            # Faces refer to vertices, texcoords and normals with the same index.
+            if mesh.texcoords is not None and mesh.normals is not None:
+                fmt = 'f %d/%d/%d %d/%d/%d %d/%d/%d'
+            elif mesh.texcoords is not None:
+                fmt = 'f %d/%d %d/%d %d/%d'
+            elif mesh.normals is not None:
+                fmt = 'f %d//%d %d//%d %d//%d'
+            else:
+                fmt = 'f %d %d %d'
+
+            faces = mesh.triangles.astype(np.int64) + offset
+            repeat = fmt.count('%d') // 3
+            np.savetxt(f, np.repeat(faces, repeat, axis=1), fmt=fmt)
+            offset += len(mesh.vertices)
+
+
+def write_egg(meshes, filename):
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('<CoordinateSystem> { Z-up }\n')
+
+        for mesh in meshes:
+            columns = [mesh.vertices]
+            fmt = '  <Vertex> %d { %.6g %.6g %.6g'
+
+            if mesh.normals is not None:
+                columns.append(mesh.normals)
+                fmt += ' <Normal> { %.6g %.6g %.6g }'
+            if mesh.texcoords is not None:
+                columns.append(mesh.texcoords)
+                fmt += ' <UV> { %.6g %.6g }'
+
+            rows = np.column_stack([np.arange(len(mesh.vertices)), *columns])
+            pool = mesh.name.replace('%', '%%')
+
+            f.write(f'<Group> {mesh.name} {{\n<VertexPool> {mesh.name} {{\n')
+            np.savetxt(f, rows, fmt=fmt + ' }')
+            f.write('}\n')
+            np.savetxt(f, mesh.triangles, fmt=f'<Polygon> {{ <VertexRef> {{ %d %d %d <Ref> {{ {pool} }} }} }}')
+            f.write('}\n')
+
+
+def write_glb(meshes, filename):
+    """Write the meshes to a binary glTF file. glTF is Y-up, so (x, y, z) is
+       converted to (x, z, -y), and v of the texcoords is flipped.
+    """
+    chunks = []
+    views = []
+    accessors = []
+    gltf_meshes = []
+    offset = 0
+
+    def add_accessor(array, component_type, accessor_type, target, **extra):
+        nonlocal offset
+        data = array.tobytes()
+        views.append(dict(buffer=0, byteOffset=offset, byteLength=len(data), target=target))
+        accessors.append(dict(bufferView=len(views) - 1, componentType=component_type,
+                              count=len(array), type=accessor_type, **extra))
+        chunks.append(data + b'\0' * (-len(data) % 4))
+        offset += len(chunks[-1])
+        return len(accessors) - 1
+
+    for mesh in meshes:
+        if not len(mesh.triangles):
+            continue
+
+        vertices = mesh.vertices[:, [0, 2, 1]] * np.array([1, 1, -1], dtype=np.float32)
+        attributes = dict(POSITION=add_accessor(
+            vertices, 5126, 'VEC3', 34962,
+            min=vertices.min(axis=0).tolist(), max=vertices.max(axis=0).tolist()
+        ))
+
+        if mesh.normals is not None:
+            normals = mesh.normals[:, [0, 2, 1]] * np.array([1, 1, -1], dtype=np.float32)
+            attributes['NORMAL'] = add_accessor(normals, 5126, 'VEC3', 34962)
+        if mesh.texcoords is not None:
+            texcoords = mesh.texcoords * np.array([1, -1], dtype=np.float32) + np.array([0, 1], dtype=np.float32)
+            attributes['TEXCOORD_0'] = add_accessor(texcoords, 5126, 'VEC2', 34962)
+
+        # 16-bit indices are enough for most models and halve the index buffer.
+        if len(mesh.vertices) <= 0xffff:
+            indices = add_accessor(mesh.triangles.reshape(-1).astype(np.uint16), 5123, 'SCALAR', 34963)
+        else:
+            indices = add_accessor(mesh.triangles.reshape(-1), 5125, 'SCALAR', 34963)
+        gltf_meshes.append(dict(name=mesh.name, primitives=[dict(attributes=attributes, indices=indices)]))
+
+    gltf = dict(
+        asset=dict(version='2.0', generator='3DModelEditor'),
+        scene=0,
+        scenes=[dict(nodes=[*range(len(gltf_meshes))])],
+        nodes=[dict(mesh=i, name=mesh['name']) for i, mesh in enumerate(gltf_meshes)],
+        meshes=gltf_meshes,
+        accessors=accessors,
+        bufferViews=views,
+        buffers=[dict(byteLength=offset)]
+    )
+
+    json_chunk = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_chunk += b' ' * (-len(json_chunk) % 4)
+    length = 12 + 8 + len(json_chunk) + 8 + offset
+
+    with open(filename, 'wb') as f:
+        f.write(struct.pack('<4sII', b'glTF', 2, length))
+        f.write(struct.pack('<I4s', len(json_chunk), b'JSON'))
+        f.write(json_chunk)
+        f.write(struct.pack('<I4s', offset, b'BIN\0'))
+
+        for chunk in chunks:
+            f.write(chunk)
+
+
+WRITERS = {
+    'obj': write_obj,
+    'egg': write_egg,
+    'glb': write_glb,
+}
+
+
+def export_model(model, filename, name=None, optimize=False):
+    """Write the model to an obj, egg or glb file, chosen by the extension of filename.
+       Returns the list of the exported meshes and OptimizeReport, which is None
+       unless optimize is True.
+    """
+    path = Path(filename)
+    write = WRITERS[path.suffix.lstrip('.').lower()]
+    report = None
+
+    if optimize:
+        model = model.copy_to(NodePath())
+        model.flatten_strong()
+        report = optimize_model(model)
+
+    meshes = extract_meshes(model, name or path.stem)
+    write(meshes, path)
+    return meshes, report
+
+
+def load_source(source):
+    """Load a model from a bam file, or from a pack file if source is [pack file, name].
+    """
+    if isinstance(source, list):
+        with PackReader(source[0]) as reader:
+            return reader.load(source[1])
+
+    options = LoaderOptions(LoaderOptions.LF_no_cache)
+
+    if (node := Loader.get_global_ptr().load_sync(Filename.from_os_specific(source), options)) is None:
+        raise OSError(f'cannot load {source}')
+
+    return NodePath(node)
+
+
+def convert(job):
+    """Load the model of job.params['source'] and export it to job.output.
+       Returns a dict of the result.
+    """
+    start = time.perf_counter()
+    model = load_source(job.params['source'])
+    meshes, report = export_model(model, job.output, job.model_name, job.params['optimize'])
+    result = dict(index=job.index, shape=job.model_name, output=job.output, status='ok',
+                  vertices=sum(len(mesh.vertices) for mesh in meshes),
+                  triangles=sum(len(mesh.triangles) for mesh in meshes),
+                  time=time.perf_counter() - start)
+
+    if report is not None:
+        result['optimized'] = report._asdict()
+
+    return result
+
+
+def make_jobs(sources, fmt, output_dir, optimize=False):
+    """Yield jobs converting the bam files and all the models in the pack files.
+    """
+    index = 0
+
+    for source in sources:
+        if Path(source).suffix == '.pack':
+            with PackReader(source) as reader:
+                names = [*reader.names()]
+
+            items = [(name, [source, name]) for name in names]
+        else:
+            items = [(Path(source).stem, source)]
+
+        for name, src in items:
+            output = str(Path(output_dir) / f'{name}.{fmt}')
+            yield Job(index, name, dict(source=src, optimize=optimize), output)
+            index += 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Convert bam files and pack files to obj, egg or glb files in parallel.'
+    )
+    parser.add_argument('sources', nargs='+', help='bam files or pack files')
+    parser.add_argument('-f', '--format', choices=WRITERS.keys(), default='glb', help='the output format')
+    parser.add_argument('-o', '--output-dir', default='.', help='the directory to write the files')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='the number of worker processes')
+    parser.add_argument('-O', '--optimize', action='store_true',
+                        help='weld vertices, remove degenerate triangles and reorder them for the vertex cache')
+    args = parser.parse_args(argv)
+
+    Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    jobs = make_jobs(args.sources, args.format, args.output_dir, args.optimize)
+    failed = 0
+
+    for result in run_jobs(jobs, convert, args.jobs):
+        if result['status'] != 'ok':
+            failed += 1
+        print(json.dumps(result), flush=True)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+from collections import namedtuple
+
+from panda3d.core import Geom
+
+
+def iter_geom_nodes(model):
+    """Yield all GeomNodes in the model, including the model node itself.
+        Args:
+            model (NodePath): a model created by shapes.
+    """
+    if model.node().is_geom_node():
+        yield model.node()
+
+    for geom_np in model.find_all_matches('**/+GeomNode'):
+        yield geom_np.node()
+
+
+def iter_geoms(model):
+    """Yield all Geoms in the model.
+    """
+    for node in iter_geom_nodes(model):
+        yield from node.get_geoms()
+
+
+def calc_model_bytes(model):
+    """Returns the number of bytes of the vertex and index arrays of the model.
+    """
+    total = 0
+
+    for geom in iter_geoms(model):
+        vdata = geom.get_vertex_data()
+        total += sum(vdata.get_array(i).get_data_size_bytes()
+                     for i in range(vdata.get_num_arrays()))
+
+        for prim in geom.get_primitives():
+            if prim.is_indexed():
+                total += prim.get_vertices().get_data_size_bytes()
+
+    return total
+
+
+def count_geometry(model):
+    """Returns the numbers of vertices and triangles of the model.
+    """
+    vertices = 0
+    triangles = 0
+
+    for geom in iter_geoms(model):
+        vertices += geom.get_vertex_data().get_num_rows()
+
+        for prim in geom.get_primitives():
+            if prim.get_primitive_type() == Geom.PT_polygons:
+                triangles += prim.get_num_faces()
+
+    return vertices, triangles
+
+
+ModelStats = namedtuple('ModelStats', ['vertices', 'triangles', 'formats', 'cpu_bytes', 'gpu_bytes'])
+
+
+NUMERIC_TYPE_NAMES = {
+    Geom.NT_uint8: 'u8',
+    Geom.NT_uint16: 'u16',
+    Geom.NT_uint32: 'u32',
+    Geom.NT_packed_dcba: 'dcba',
+    Geom.NT_packed_dabc: 'dabc',
+    Geom.NT_float32: 'f32',
+    Geom.NT_float64: 'f64',
+    Geom.NT_int8: 'i8',
+    Geom.NT_int16: 'i16',
+    Geom.NT_int32: 'i32',
+}
+
+
+def describe_format(fmt):
+    """Returns the columns of GeomVertexFormat as a string, e.g. 'vertex:3f32 normal:3f32',
+       followed by the bytes per vertex.
+    """
+    columns = []
+    stride = 0
+
+    for i in range(fmt.get_num_arrays()):
+        array_format = fmt.get_array(i)
+        stride += array_format.get_stride()
+
+        for column in array_format.get_columns():
+            type_name = NUMERIC_TYPE_NAMES.get(column.get_numeric_type(), '?')
+            columns.append(f'{column.get_name()}:{column.get_num_components()}{type_name}')
+
+    return f'{" ".join(columns)} ({stride} bytes)'
+
+
+def calc_gpu_bytes(model, gsg):
+    """Returns the number of bytes of the vertex and index buffers of the model
+       which have been uploaded to the graphics memory of gsg.
+    """
+    prepared = gsg.get_prepared_objects()
+    total = 0
+
+    for geom in iter_geoms(model):
+        vdata = geom.get_vertex_data()
+
+        for i in range(vdata.get_num_arrays()):
+            if (array := vdata.get_array(i)).is_prepared(prepared):
+                total += array.get_data_size_bytes()
+
+        for prim in geom.get_primitives():
+            if prim.is_indexed() and prepared.is_index_buffer_prepared(prim):
+                total += prim.get_vertices().get_data_size_bytes()
+
+    return total
+
+
+def get_model_stats(model, gsg=None):
+    """Returns ModelStats of the model. gpu_bytes is None if gsg is not given.
+        Args:
+            model (NodePath): a model created by shapes.
+            gsg (GraphicsStateGuardian): the gsg rendering the model.
+    """
+    vertices, triangles = count_geometry(model)
+    formats = sorted({describe_format(geom.get_vertex_data().get_format()) for geom in iter_geoms(model)})
+    gpu_bytes = None if gsg is None else calc_gpu_bytes(model, gsg)
+
+    return ModelStats(vertices, triangles, formats, calc_model_bytes(model), gpu_bytes)
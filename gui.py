@@ -1,4 +1,5 @@
-from direct.gui.DirectGui import DirectEntry, DirectFrame, DirectLabel, DirectButton, OkDialog
+from direct.gui.DirectGui import DirectEntry, DirectFrame, DirectLabel, DirectButton, OkDialog, YesNoDialog
+from direct.gui.OnscreenText import OnscreenText
 import direct.gui.DirectGuiGlobals as DGG
 from panda3d.core import TransparencyAttrib
 from panda3d.core import Point3, LColor, Vec4
@@ -20,17 +21,67 @@ class Frame(DirectFrame):
         self.set_transparency(TransparencyAttrib.MAlpha)
 
 
+class StatsPanel:
+    """Show the statistics of the displayed model.
+        Args:
+            parent (NodePath): the parent of the text.
+            font (TextFont): the font of the text.
+    """
+
+    def __init__(self, parent, font):
+        self.text = OnscreenText(
+            parent=parent,
+            pos=(-0.05, 0.3),
+            scale=0.04,
+            fg=LColor(1, 1, 1, 1),
+            bg=LColor(0, 0, 0, 0.5),
+            font=font,
+            align=TextNode.ARight,
+            mayChange=True
+        )
+
+    def toggle(self):
+        if self.text.is_hidden():
+            self.text.show()
+        else:
+            self.text.hide()
+
+    def set_stats(self, model_name, stats, build_time, source):
+        """Args:
+            stats (geom_stats.ModelStats): the statistics of the model.
+            build_time (float): seconds taken to create the model.
+            source (str): how the model was got, like 'built' or 'cached'.
+        """
+        gpu = 'not uploaded' if not stats.gpu_bytes else f'{stats.gpu_bytes / 1024 ** 2:.2f} MB'
+        lines = [
+            model_name,
+            f'vertices {stats.vertices:,}  triangles {stats.triangles:,}',
+            *stats.formats,
+            f'cpu {stats.cpu_bytes / 1024 ** 2:.2f} MB  gpu {gpu}',
+            f'{source} in {build_time * 1000:.1f} ms',
+        ]
+        self.text.setText('\n'.join(lines))
+
+
 class Gui:
 
     frame_color = LColor(0.6, 0.6, 0.6, 1)
     text_color = LColor(1.0, 1.0, 1.0, 1.0)
     text_size = 0.05
     font_file = 'fonts/DejaVuSans.ttf'
+    rows_per_page = 16
 
     def __init__(self, controller_parent, selector_parent, model_names):
         self.font = base.loader.load_font(self.font_file)
         self.entries = {}
         self.buttons = []
+        self.page_widgets = []
+
+        # The parameter names of the selected shape, and the entered values of each shape.
+        self.model_name = None
+        self.param_names = ()
+        self.values = {}
+        self.page = 0
         self.create_widgets(controller_parent, selector_parent, model_names)
 
         base.accept('tab', self.change_focus, [True])
@@ -47,6 +98,7 @@ class Gui:
         )
 
         last_z = self.create_input_boxes(frame)
+        self.create_page_btns(frame, last_z)
         _ = self.create_control_btns(frame, last_z)
 
     def create_selector_area(self, parent, model_names):
@@ -88,10 +140,10 @@ class Gui:
             self.buttons.append(btn)
 
     def create_input_boxes(self, parent):
-        start_z = 0.88
+        start_z = 0.9
 
-        for i in range(16):
-            z = start_z - i * 0.1
+        for i in range(self.rows_per_page):
+            z = start_z - i * 0.09
 
             label = DirectLabel(
                 parent=parent,
@@ -116,6 +168,8 @@ class Gui:
                 text_font=self.font,
                 initialText='',
             )
+            entry.bind(DGG.TYPE, base.input_changed)
+            entry.bind(DGG.ERASE, base.input_changed)
             self.entries[label] = entry
 
             if i == 0:
@@ -123,14 +177,54 @@ class Gui:
 
         return z
 
+    def create_page_btns(self, parent, last_z):
+        """Create the buttons to turn the pages of the entry boxes,
+           which are shown only if the shape has more parameters than rows_per_page.
+        """
+        z = last_z - 0.075
+
+        for x, text, step in [(0.3, '<', -1), (0.5, '>', 1)]:
+            btn = DirectButton(
+                parent=parent,
+                pos=Point3(x, 0, z),
+                relief=DGG.RAISED,
+                frameSize=(-0.04, 0.04, -0.03, 0.03),
+                frameColor=self.frame_color,
+                borderWidth=(0.005, 0.005),
+                text=text,
+                text_fg=self.text_color,
+                text_scale=self.text_size,
+                text_font=self.font,
+                text_pos=(0, -0.015),
+                command=self.turn_page,
+                extraArgs=[step]
+            )
+            self.buttons.append(btn)
+            self.page_widgets.append(btn)
+
+        self.page_label = DirectLabel(
+            parent=parent,
+            pos=Point3(0.4, 0, z - 0.015),
+            frameColor=LColor(1, 1, 1, 0),
+            text='',
+            text_fg=self.text_color,
+            text_font=self.font,
+            text_scale=self.text_size * 0.8,
+        )
+        self.page_widgets.append(self.page_label)
+
     def create_control_btns(self, parent, start_z):
         buttons = [
             ('Reflect Changes', base.reflect_changes),
             ('Output BamFile', base.output_bam_file),
+            ('Output LOD BamFile', base.output_lod_bam_file),
             ('Toggle Wireframe', base.toggle_wireframe),
             ('Toggle Rotation', base.toggle_rotation),
+            ('Live Preview', base.toggle_live_preview),
+            ('Save Preset', base.save_preset),
+            ('Load Preset', base.load_preset),
         ]
-        start_z -= 0.18
+        start_z -= 0.15
 
         for i, (text, cmd) in enumerate(buttons):
             q, mod = divmod(i, 2)
@@ -155,39 +249,113 @@ class Gui:
 
         return z
 
-    def set_default_values(self, params):
-        """Set default values for entry boxes.
+    def set_params(self, model_name, param_names, default_params):
+        """Show the entry boxes of the parameters of the shape. The values entered
+           for the shape before are restored, and the others are the default values.
             Args:
-                params (dict): {parameter name: its value,,,,}
+                model_name (str): a key of SHAPES.
+                param_names (tuple): the names of the parameters in the order of the boxes.
+                default_params (dict): {parameter name: its value,,,,}
+        """
+        self.save_values()
+        self.model_name = model_name
+        self.param_names = param_names
+        values = self.values.setdefault(model_name, {})
+
+        for name in param_names:
+            values.setdefault(name, str(default_params[name]))
+
+        self.page = 0
+        self.show_page()
+
+    @property
+    def num_pages(self):
+        return max(1, -(-len(self.param_names) // self.rows_per_page))
+
+    def get_page_names(self):
+        start = self.page * self.rows_per_page
+        return self.param_names[start:start + self.rows_per_page]
+
+    def show_page(self):
+        """Show the parameters of the current page. Only the labels and entry boxes
+           whose text differs are updated.
         """
-        keys = [*params.keys()]
-        key_cnt = len(keys)
+        names = self.get_page_names()
+        values = self.values[self.model_name]
 
         for i, (label, entry) in enumerate(self.entries.items()):
-            if i < key_cnt:
-                k = keys[i]
-                label.setText(k)
-                entry.enterText(str(params[k]))
+            if i < len(names):
+                name = names[i]
+
+                if label['text'] != name:
+                    label.setText(name)
+                if entry.get() != values[name]:
+                    entry.enterText(values[name])
+
+                entry.show()
                 continue
 
-            label.setText('')
-            entry.enterText('')
+            if label['text']:
+                label.setText('')
+                entry.enterText('')
+                entry['focus'] = 0
+            entry.hide()
+
+        if (pages := self.num_pages) > 1:
+            self.page_label.setText(f'{self.page + 1}/{pages}')
+
+            for widget in self.page_widgets:
+                widget.show()
+        else:
+            for widget in self.page_widgets:
+                widget.hide()
+
+    def save_values(self):
+        """Keep the values entered in the entry boxes of the current page.
+        """
+        if self.model_name is None:
+            return
+
+        values = self.values[self.model_name]
+
+        for name, entry in zip(self.get_page_names(), self.entries.values()):
+            values[name] = entry.get()
+
+    def turn_page(self, step):
+        self.save_values()
+        self.page = (self.page + step) % self.num_pages
+        self.show_page()
+
+    def set_values(self, params):
+        """Replace the values of the selected shape, e.g. with a preset.
+            Args:
+                params (dict): {parameter name: its value,,,,}
+        """
+        values = self.values[self.model_name]
+        values.update((name, str(params[name])) for name in self.param_names if name in params)
+        self.show_page()
+
+    def get_all_values(self):
+        """Returns the values entered for all the shapes as {shape: {parameter name: text}}.
+        """
+        self.save_values()
+        return {model_name: dict(values) for model_name, values in self.values.items()}
 
     def get_input_values(self):
-        """Returns the values entered in the entry box.
+        """Returns the values entered for the selected shape, including the other pages.
         """
-        return {param_name: entry.get() for label, entry in self.entries.items()
-                if (param_name := label['text'])}
+        self.save_values()
+        return dict(self.values[self.model_name])
 
     def change_focus(self, go_down):
-        entries = list(self.entries.values())
+        entries = list(self.entries.values())[:len(self.get_page_names())]
 
         for i, entry in enumerate(entries):
             if entry['focus']:
                 if go_down:
-                    next_idx = i + 1 if i < len(self.entries) - 1 else 0
+                    next_idx = i + 1 if i < len(entries) - 1 else 0
                 else:
-                    next_idx = len(self.entries) - 1 if i == 0 else i - 1
+                    next_idx = len(entries) - 1 if i == 0 else i - 1
 
                 entry['focus'] = 0
                 entries[next_idx]['focus'] = 1
@@ -222,14 +390,99 @@ class Gui:
             command=self.withdraw_dialog
         )
 
+    def show_confirm_dialog(self, msgs, command):
+        """Show a dialog with Yes and No buttons.
+            Args:
+                msgs (str): the message.
+                command (callable): called with True if Yes is clicked, otherwise False.
+        """
+        self.change_buttons_state(DGG.DISABLED)
+
+        def close(answer):
+            self.withdraw_dialog(answer)
+            command(answer)
+
+        self.dialog = YesNoDialog(
+            dialogName='confirm',
+            frameSize=(-1.2, 1.2, -0.15, 0.01),
+            frameColor=(1, 1, 1, 0),
+            relief=DGG.FLAT,
+            pos=Point3(0.5, 0, 0.0),
+            midPad=0.02,
+            text=msgs,
+            text_scale=self.text_size,
+            text_font=self.font,
+            text_fg=self.text_color,
+            buttonSize=(-0.08, 0.08, -0.05, 0.05),
+            button_frameColor=self.frame_color,
+            button_text_pos=(0, -0.01),
+            button_text_scale=0.04,
+            button_text_fg=self.text_color,
+            command=close
+        )
+
+    def show_select_dialog(self, msgs, choices, command):
+        """Show a dialog with a button for each choice in a column and a Cancel button.
+            Args:
+                msgs (str): the message.
+                choices (list): the texts of the buttons.
+                command (callable): called with the index of the clicked choice, or None if canceled.
+        """
+        self.change_buttons_state(DGG.DISABLED)
+        half_h = 0.05 * (len(choices) + 3)
+
+        self.dialog = DirectFrame(
+            frameSize=(-0.6, 0.6, -half_h, half_h),
+            frameColor=self.frame_color,
+            relief=DGG.RAISED,
+            borderWidth=(0.01, 0.01),
+            pos=Point3(0.5, 0, 0.0),
+        )
+        self.dialog.cleanup = self.dialog.destroy
+
+        DirectLabel(
+            parent=self.dialog,
+            pos=Point3(0, 0, half_h - 0.08),
+            frameColor=LColor(1, 1, 1, 0),
+            text=msgs,
+            text_fg=self.text_color,
+            text_font=self.font,
+            text_scale=self.text_size,
+        )
+
+        def close(index):
+            self.withdraw_dialog(index)
+            command(index)
+
+        for i, text in enumerate([*choices, 'Cancel']):
+            DirectButton(
+                parent=self.dialog,
+                pos=Point3(0, 0, half_h - 0.2 - i * 0.1),
+                relief=DGG.RAISED,
+                frameSize=(-0.5, 0.5, -0.045, 0.045),
+                frameColor=self.frame_color,
+                borderWidth=(0.01, 0.01),
+                text=text,
+                text_fg=self.text_color,
+                text_scale=0.04,
+                text_font=self.font,
+                text_pos=(0, -0.01),
+                command=close,
+                extraArgs=[i if i < len(choices) else None]
+            )
+
     def change_buttons_state(self, state):
         for button in self.buttons:
             button['state'] = state
 
     def withdraw_dialog(self, btn):
+        dialog = self.dialog
+
         def withdraw(task):
-            self.dialog.cleanup()
+            dialog.cleanup()
             self.change_buttons_state(DGG.NORMAL)
+            # Called by a timer, not by an input, so the change is not rendered otherwise.
+            base.request_redraw()
             return task.done
 
         base.taskMgr.do_method_later(0.2, withdraw, 'withdraw')
@@ -0,0 +1,79 @@
+import argparse
+import subprocess
+import sys
+from collections import namedtuple
+
+
+# Modules that run without a window and must not load the GUI.
+HEADLESS = [
+    'shape_registry', 'builder', 'batch', 'sweep', 'benchmark', 'lod', 'bam_cache', 'model_cache', 'rescale',
+    'pack', 'export', 'optimize', 'thumbnails', 'estimate', 'budget', 'presets', 'geom_stats', 'vertex_arrays'
+]
+EDITOR = ['gui', 'profiler', 'wireframe', 'quality', 'variant_grid', 'model_editor']
+
+GUI_MODULES = ('direct.gui', 'direct.showbase', 'gui', 'profiler')
+
+
+ImportTime = namedtuple('ImportTime', ['name', 'self_us', 'cumulative_us'])
+
+
+def measure(module):
+    """Import the module in a new interpreter with -X importtime,
+       and returns a list of ImportTime of all the modules imported by it.
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True
+    )
+
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    times = []
+
+    # import time: self [us] | cumulative | imported package
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative_us, name = line.removeprefix('import time:').split('|')
+        times.append(ImportTime(name.strip(), int(self_us), int(cumulative_us)))
+
+    return times
+
+
+def report(module, top=5):
+    times = measure(module)
+    total = next(t.cumulative_us for t in times if t.name == module)
+    gui = sorted({t.name for t in times if t.name.startswith(GUI_MODULES)})
+
+    print(f'{module}: {total / 1000:.1f} ms, {len(times)} modules')
+
+    for t in sorted(times, key=lambda t: t.self_us, reverse=True)[:top]:
+        print(f'    {t.name:<40} self {t.self_us / 1000:7.1f} ms  cumulative {t.cumulative_us / 1000:7.1f} ms')
+
+    return gui
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Report the import time of each module, and check that headless modules do not import the GUI.'
+    )
+    parser.add_argument('modules', nargs='*', help='modules to measure; all the modules by default')
+    parser.add_argument('-t', '--top', type=int, default=5, help='the number of the slowest imports shown')
+    args = parser.parse_args(argv)
+
+    failed = False
+
+    for module in args.modules or [*HEADLESS, *EDITOR]:
+        gui = report(module, args.top)
+
+        if module in HEADLESS and gui:
+            print(f'    ERROR: imports the GUI: {", ".join(gui)}')
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import argparse
+import json
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from panda3d.core import ConfigVariableList, Filename, LColor, LODNode, NodePath
+from pydantic import ValidationError
+
+from builder import build_model, decode_model
+from shape_registry import SHAPES, validate, format_errors, scale_segments
+
+
+lod_scales = ConfigVariableList(
+    'lod-scale',
+    'The scales of the segment counts of each level of detail, from the nearest level.'
+)
+
+lod_distances = ConfigVariableList(
+    'lod-distance',
+    'The distance at which each level of detail switches to the next one.'
+)
+
+DEFAULT_SCALES = (1.0, 0.5, 0.25)
+DEFAULT_DISTANCES = (20.0, 40.0, 80.0)
+
+
+def get_lod_settings():
+    """Returns the scales and the switch distances from the config variables,
+       or the defaults if they are not set.
+    """
+    scales = [float(v) for v in lod_scales] or DEFAULT_SCALES
+    distances = [float(v) for v in lod_distances] or DEFAULT_DISTANCES
+    return scales, distances
+
+
+def get_level_params(model_name, params, scales):
+    """Returns a list of the parameters of each level. The levels whose segment counts are
+       the same as the previous level, because of the lower bounds, are left out.
+    """
+    levels = []
+
+    for scale in scales:
+        level_params = scale_segments(model_name, params, scale)
+
+        if not levels or level_params != levels[-1]:
+            levels.append(level_params)
+
+    return levels
+
+
+def build_lod(model_name, params, scales, distances, max_workers=None):
+    """Build the model at several segment counts in parallel and returns a NodePath
+       of LODNode, whose children are the levels from the nearest.
+        Args:
+            model_name (str): a key of SHAPES.
+            params (dict): validated parameters.
+            scales (list): the scales of the segment counts of each level.
+            distances (list): the far distance of each level.
+    """
+    if len(distances) < len(scales):
+        raise ValueError('a distance is needed for each level')
+
+    levels = get_level_params(model_name, params, scales)
+    ctx = multiprocessing.get_context('spawn')
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as executor:
+        data = [*executor.map(build_model, [model_name] * len(levels), levels)]
+
+    lod_np = NodePath(LODNode(f'{model_name}_lod'))
+    near = 0
+
+    for i, level_data in enumerate(data):
+        level = decode_model(level_data)
+        level.set_name(f'{model_name}_lod{i}')
+        level.set_color(LColor(1, 1, 1, 1))
+        level.flatten_strong()
+        level.reparent_to(lod_np)
+
+        lod_np.node().add_switch(distances[i], near)
+        near = distances[i]
+
+    return lod_np
+
+
+def write_lod_bam_file(model_name, params, filename, scales=None, distances=None):
+    """Build the levels of detail and write them to a bam file.
+       Scales and distances default to the config variables.
+    """
+    default_scales, default_distances = get_lod_settings()
+    scales = default_scales if scales is None else scales
+    distances = default_distances if distances is None else distances
+
+    lod_np = build_lod(model_name, params, scales, distances)
+
+    if not lod_np.write_bam_file(Filename.from_os_specific(filename)):
+        raise OSError(f'cannot write {filename}')
+
+    return lod_np
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Write a model with levels of detail to a bam file.'
+    )
+    parser.add_argument('shape', choices=SHAPES.keys())
+    parser.add_argument('-p', '--params', type=json.loads, default={},
+                        help='parameters as a json object, e.g. \'{"segs_r": 100}\'')
+    parser.add_argument('-s', '--scales', nargs='+', type=float, help='the scales of the segment counts')
+    parser.add_argument('-d', '--distances', nargs='+', type=float, help='the far distance of each level')
+    parser.add_argument('-o', '--output', required=True, help='the bam file to write')
+    args = parser.parse_args(argv)
+
+    try:
+        params = validate(args.shape, args.params)
+    except ValidationError as e:
+        print('\n'.join(format_errors(e)))
+        return 1
+
+    try:
+        lod_np = write_lod_bam_file(args.shape, params, args.output, args.scales, args.distances)
+    except OSError as e:
+        print(e)
+        return 1
+
+    lod = lod_np.node()
+
+    for i in range(lod.get_num_switches()):
+        print(f'{lod_np.get_child(i).get_name()}: {lod.get_in(i)} - {lod.get_out(i)}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+
+from panda3d.core import ConfigVariableInt, NodePath
+
+from geom_stats import calc_model_bytes
+
+
+model_cache_size = ConfigVariableInt(
+    'model-cache-size', 256 * 1024 * 1024,
+    'The maximum number of bytes of geometry kept in the in-memory model cache.'
+)
+
+
+class ModelCache:
+    """An LRU cache of built models keyed on the model class and the validated parameters.
+        Args:
+            max_bytes (int): the memory budget; the least recently used models are evicted
+                             when the total size of the cached geometry exceeds it.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = model_cache_size.get_value() if max_bytes is None else max_bytes
+        self.models = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_cls, params):
+        """Args:
+            model_cls (type): a model class in shapes.
+            params (dict): the result of model_dump() of a validator.
+        """
+        return (model_cls, tuple(sorted(params.items())))
+
+    def get(self, key):
+        """Returns a copy of the cached model, or None if not cached.
+        """
+        if (item := self.models.get(key)) is None:
+            self.misses += 1
+            return None
+
+        self.models.move_to_end(key)
+        self.hits += 1
+        model, _ = item
+        return model.copy_to(NodePath())
+
+    def put(self, key, model):
+        """Cache a copy of the model, so that changes to the displayed
+           model do not affect the cached one.
+        """
+        if key in self.models:
+            self.remove(key)
+
+        if (nbytes := calc_model_bytes(model)) > self.max_bytes:
+            return
+
+        self.models[key] = (model.copy_to(NodePath()), nbytes)
+        self.total_bytes += nbytes
+
+        while self.total_bytes > self.max_bytes:
+            key = next(iter(self.models))
+            self.remove(key)
+            self.evictions += 1
+
+    def remove(self, key):
+        model, nbytes = self.models.pop(key)
+        model.remove_node()
+        self.total_bytes -= nbytes
+
+    def clear(self):
+        for key in [*self.models.keys()]:
+            self.remove(key)
+
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            models=len(self.models),
+            total_bytes=self.total_bytes,
+            max_bytes=self.max_bytes
+        )
@@ -1,6 +1,8 @@
-import sys
 import math
-from collections import namedtuple
+import time
+import threading
+from argparse import ArgumentTypeError
+from concurrent.futures import Future
 from enum import Enum, auto
 from datetime import datetime
 
@@ -11,73 +13,77 @@ from panda3d.core import AmbientLight, DirectionalLight
 from panda3d.core import NodePath
 from panda3d.core import load_prc_file_data
 from panda3d.core import OrthographicLens, Camera, MouseWatcher, PGTop
-from panda3d.core import AntialiasAttrib
 from panda3d.core import Texture, TextureStage
+from panda3d.core import ConfigVariableDouble, ConfigVariableString, ConfigVariableInt, ConfigVariableBool
 from pydantic import ValidationError
 
-from gui import Gui
-from shapes import (
-    Cylinder,
-    Sphere,
-    Torus,
-    Cone,
-    Box,
-    RightTriangularPrism,
-    Plane,
-    EllipticalPrism,
-    Capsule,
-    CapsulePrism,
-    RoundedCornerBox,
-    RoundedEdgeBox,
-    Ellipsoid,
-    # Icosphere,
-    # Cubesphere
-)
-from validators import (
-    ConeValidator,
-    CylinderValidator,
-    TorusValidator,
-    SphereValidator,
-    BoxValidator,
-    RightTriangularPrismValidator,
-    PlaneValidator,
-    CapsuleValidator,
-    CapsulePrismValidator,
-    EllipticalPrismValidator,
-    RoundedCornerBoxValidator,
-    RoundedEdgeBoxValidator,
-    EllipsoidValidator
-)
+from gui import Gui, StatsPanel
+from builder import ModelBuilder, create_model, decode_model
+from model_cache import ModelCache
+from bam_cache import BamCache
+from shape_registry import SHAPES, validate, format_errors, scale_segments, get_default_params, get_param_names
+from geom_stats import count_geometry, get_model_stats
+from estimate import estimate
+from budget import check_budget, max_model_memory, max_build_time
+from profiler import FrameProfiler
+from lod import write_lod_bam_file
+from rescale import get_scale, rescale_model
+from pack import PackWriter
+from optimize import optimize_model, format_report, compact_model, format_compact_report
+from wireframe import WireframeOverlay
+from quality import RenderQuality, get_prc_data
+from presets import PresetStore
+from variant_grid import VariantGrid, parse_variants, make_variant_grid, max_variants
 
 
-# Without 'framebuffer-multisample' and 'multisamples' settings,
-# there appears to be no effect of 'set_antialias(AntialiasAttrib.MAuto)'.
 load_prc_file_data("", """
     win-size 1200 600
     window-title ProceduralShapes
-    framebuffer-multisample 1
-    multisamples 2
     """)
 
 
-Shape = namedtuple('Shape', ['model', 'validator'])
+preview_delay = ConfigVariableDouble(
+    'preview-delay', 0.3,
+    'Seconds to wait after the last keystroke before the live preview rebuilds the model.'
+)
+
+preview_proxy_scale = ConfigVariableDouble(
+    'preview-proxy-scale', 0.25,
+    'The scale of the segment counts of the proxy shown while the live preview is building.'
+)
+
+triangle_warning = ConfigVariableInt(
+    'triangle-warning', 1_000_000,
+    'If a model is estimated to have more triangles than this, the editor asks before building it.'
+)
 
+optimize_export = ConfigVariableBool(
+    'optimize-export', True,
+    'If true, [Output BamFile] welds duplicate vertices, removes degenerate triangles '
+    'and reorders the triangles for the vertex cache before writing.'
+)
 
-SHAPES = {
-    'cone': Shape(Cone, ConeValidator),
-    'cylinder': Shape(Cylinder, CylinderValidator),
-    'torus': Shape(Torus, TorusValidator),
-    'sphere': Shape(Sphere, SphereValidator),
-    'box': Shape(Box, BoxValidator),
-    'triangle': Shape(RightTriangularPrism, RightTriangularPrismValidator),
-    'plane': Shape(Plane, PlaneValidator),
-    'capsule': Shape(Capsule, CapsuleValidator),
-    'capsule_prism': Shape(CapsulePrism, CapsulePrismValidator),
-    'elliptical_prism': Shape(EllipticalPrism, EllipticalPrismValidator),
-    'rounded_corner_box': Shape(RoundedCornerBox, RoundedCornerBoxValidator),
-    'rounded_edge_box': Shape(RoundedEdgeBox, RoundedEdgeBoxValidator),
-    'ellipsoid': Shape(Ellipsoid, EllipsoidValidator)
-}
+compact_export = ConfigVariableBool(
+    'compact-export', True,
+    'If true, [Output BamFile] drops the color column, interleaves the vertex columns '
+    'and uses 16-bit indices if the number of vertices allows.'
+)
+
+on_demand_rendering = ConfigVariableBool(
+    'on-demand-rendering', True,
+    'If true, frames are rendered only while the model is rotating, being dragged or replaced, '
+    'or the user is operating the editor; otherwise the main loop sleeps.'
+)
+
+idle_sleep = ConfigVariableDouble(
+    'idle-sleep', 0.05,
+    'Seconds the main loop sleeps per iteration while nothing needs to be rendered.'
+)
+
+output_pack_file = ConfigVariableString(
+    'output-pack-file', '',
+    'If set, [Output BamFile] adds the models to this pack file instead of writing a bam file each time.'
+)
 
 
 class Status(Enum):
@@ -85,15 +91,18 @@ class Status(Enum):
     SHOW_MODEL = auto()
     REPLACE_MODEL = auto()
     REPLACE_CLASS = auto()
+    BUILDING = auto()
+    PREVIEW_MODEL = auto()
 
 
 class ModelDisplay(ShowBase):
 
     def __init__(self):
+        # The multisamples of the quality preset must be set before the window opens.
+        load_prc_file_data('', get_prc_data())
         super().__init__()
         # self.setBackgroundColor(0.6, 0.6, 0.6)
         self.disable_mouse()
-        self.render.set_antialias(AntialiasAttrib.MAuto)
         self.setup_light()
 
         # Create model display region.
@@ -111,6 +120,8 @@ class ModelDisplay(ShowBase):
             selector_parent=self.slct_aspect2d,
             model_names=SHAPES.keys()
         )
+        self.profiler = FrameProfiler(self.ctrl_aspect2d, self.gui.font)
+        self.stats_panel = StatsPanel(self.a2dBottomRight, self.gui.font)
 
         # Define variables.
         self.is_rotating = True
@@ -118,46 +129,346 @@ class ModelDisplay(ShowBase):
         self.show_wireframe = True
         self.dragging = False
         self.before_mouse_pos = None
+        self.builder = ModelBuilder(max_model_memory.get_value(), max_build_time.get_value())
+        self.proxy_builder = ModelBuilder(max_model_memory.get_value(), max_build_time.get_value())
+        self.live_preview = False
+        self.model_params = None
+        self.display_params = None
+        self.display_model_name = None
+        self.model_cache = ModelCache()
+        self.bam_cache = BamCache()
+        self.pack_writer = None
+        self.build_time = 0
+        self.build_source = 'built'
+        self.variant_grid = None
+        self.redraw_frames = 0
+        self.was_idle = False
+        self.wireframe = WireframeOverlay(self.render, self.show_wireframe)
 
         # Show model.
-        self.model_name = 'cone'
+        self.presets = PresetStore()
+        self.model_name = self.restore_session()
         model = self.create_new_model()
-        self.dispay_model(model, hpr=Vec3(0, 0, 0))
-        self.state = Status.SHOW_MODEL
+        self.dispay_model(model, self.model_name, self.model_params, hpr=Vec3(0, 0, 0))
+        # The values entered last time are built like when the shape is selected.
+        self.state = Status.REPLACE_CLASS if self.model_name in self.gui.values else Status.SHOW_MODEL
         # self.accept('d', self.toggle_wireframe)
         # self.accept('r', self.toggle_rotation)
 
-        self.accept('escape', sys.exit)
+        self.accept('escape', self.exit_editor)
         self.accept('mouse1', self.mouse_click)
         self.accept('mouse1-up', self.mouse_release)
+        self.accept('f1', self.profiler.toggle)
+        self.accept('f2', self.export_trace)
+        self.accept('f3', self.stats_panel.toggle)
+        self.accept('f4', self.cancel_build)
+        self.accept('f5', self.toggle_variants)
+        self.accept('f6', self.change_quality)
+
+        # Any key, mouse button or mouse move makes frames be rendered.
+        for button_thrower in self.buttonThrowers or []:
+            button_thrower.node().set_button_down_event('user-input')
+            button_thrower.node().set_button_up_event('user-input')
+            button_thrower.node().set_button_repeat_event('user-input')
+            button_thrower.node().set_move_event('user-input')
+        self.accept('user-input', lambda *args: self.request_redraw())
         self.taskMgr.add(self.update, 'update')
 
+    def windowEvent(self, win):
+        super().windowEvent(win)
+        self.request_redraw()
+
+    def request_redraw(self, frames=2):
+        """Render the next frames even if nothing is moving. More than one frame is
+           rendered, because some changes, like gui state, appear a frame later.
+        """
+        self.redraw_frames = max(self.redraw_frames, frames)
+
+    def needs_redraw(self):
+        """Returns True if the screen can change in this frame.
+        """
+        return (not on_demand_rendering.get_value()
+                or self.redraw_frames > 0
+                or self.is_rotating
+                or self.dragging
+                or self.state != Status.SHOW_MODEL)
+
+    def exit_editor(self):
+        self.userExit()
+
+    def finalizeExit(self):
+        # Called by userExit, also when the window is closed, to write the index
+        # of the pack file and the session before exiting.
+        self.builder.shutdown()
+        self.proxy_builder.shutdown()
+        self.close_variants()
+
+        if self.pack_writer is not None:
+            self.pack_writer.close()
+            self.pack_writer = None
+
+        self.presets.save_session(self.gui.get_all_values(), self.model_name)
+        self.presets.close()
+        self.bam_cache.close()
+        super().finalizeExit()
+
+    def restore_session(self):
+        """Restore the values entered last time into the gui, and returns the shape selected last time.
+        """
+        entered, model_name = self.presets.load_session()
+
+        for name, values in entered.items():
+            if name in SHAPES:
+                param_names = get_param_names(name)
+                self.gui.values[name] = {k: v for k, v in values.items() if k in param_names}
+
+        return model_name if model_name in SHAPES else 'cone'
+
+    def save_preset(self):
+        """Save the entered values as a preset. The displayed model is saved with them
+           if it has been built with the same values.
+        """
+        try:
+            params = validate(self.model_name, self.gui.get_input_values())
+        except ValidationError as e:
+            self.gui.show_dialog('\n'.join(format_errors(e)))
+            return
+
+        model = None
+
+        if self.display_model_name == self.model_name and params == self.display_params:
+            # The geometry without the transform and the render states set by dispay_model.
+            model = self.model.copy_to(NodePath())
+            model.clear_transform()
+            model.clear_color()
+
+        preset_id = self.presets.save(self.model_name, params, model)
+        self.gui.show_dialog(f'Saved as {self.presets.get(preset_id).name}.')
+
+    def load_preset(self):
+        """Show the latest presets of the shape, and display the selected one.
+           The model saved with the preset is displayed without building it.
+        """
+        presets = self.presets.search(self.model_name, limit=10)
+
+        if not presets:
+            self.gui.show_dialog(f'No presets of {self.model_name}.')
+            return
+
+        choices = [f'{p.name}  {datetime.fromtimestamp(p.created):%Y-%m-%d %H:%M}' for p in presets]
+
+        def load(index):
+            if index is None or self.state != Status.SHOW_MODEL:
+                return
+
+            preset = presets[index]
+            self.close_variants()
+            self.gui.set_values(preset.params)
+
+            if (model := self.presets.load_model(preset.id)) is not None:
+                self.cache_model(self.model_name, preset.params, model)
+                self.model_params = preset.params
+                self.set_build_time(0, 'preset')
+                self.dispay_model(model, self.model_name, preset.params)
+            else:
+                self.request_model(preset.params)
+
+                if self.builder.is_building:
+                    self.state = Status.BUILDING
+
+        self.gui.show_select_dialog(f'Presets of {self.model_name}', choices, load)
+
+    def export_trace(self):
+        filename = self.profiler.export()
+        print(f'Frame profile is written to {filename}.')
+
     def output_bam_file(self):
-        model_type = self.model_cls.__name__.lower()
+        # The displayed model is exported, even while a new one is being built.
+        model_type = SHAPES[self.display_model_name].model.__name__.lower()
         num = datetime.now().strftime('%Y%m%d%H%M%S')
-        filename = f'{model_type}_{num}.bam'
 
-        output_model = self.model.copy_to(self.render)
+        # The copy is flattened under its own parent, without being attached to render.
+        output_model = self.model.copy_to(NodePath('output'))
         output_model.set_render_mode_filled()
         output_model.set_hpr(Vec3(0, 0, 0))
         output_model.set_color(LColor(1, 1, 1, 1))
         output_model.flatten_strong()
 
-        # output_mode.clear_color()
-        output_model.writeBamFile(filename)
+        if optimize_export.get_value():
+            report = optimize_model(output_model)
+            print(f'{model_type}: {format_report(report)}')
+
+        if compact_export.get_value():
+            report = compact_model(output_model)
+            print(f'{model_type}: {format_compact_report(report)}')
+
+        if pack_file := output_pack_file.get_value():
+            # The models are added to those exported in earlier sessions,
+            # and the index of the pack file is written when the editor exits.
+            if self.pack_writer is None:
+                try:
+                    self.pack_writer = PackWriter(pack_file, append=True)
+                except ValueError as e:
+                    self.gui.show_dialog(str(e))
+                    output_model.remove_node()
+                    return
+
+            # The number of the models in the pack, including the earlier ones, keeps the name unique.
+            name = f'{model_type}_{num}_{len(self.pack_writer)}'
+            self.pack_writer.add_model(
+                name, output_model, shape=self.display_model_name, params=self.display_params)
+        else:
+            # output_mode.clear_color()
+            output_model.writeBamFile(f'{model_type}_{num}.bam')
+
         output_model.remove_node()
 
+    def output_lod_bam_file(self):
+        """Write the current model with levels of detail to a bam file.
+           The levels are built in worker processes, waited for in a thread.
+        """
+        model_type = SHAPES[self.display_model_name].model.__name__.lower()
+        num = datetime.now().strftime('%Y%m%d%H%M%S')
+        filename = f'{model_type}_lod_{num}.bam'
+        future = Future()
+
+        def write(model_name, params):
+            try:
+                future.set_result(write_lod_bam_file(model_name, params, filename))
+            except Exception as e:
+                future.set_exception(e)
+
+        thread = threading.Thread(
+            target=write,
+            args=(self.display_model_name, self.display_params),
+            daemon=True
+        )
+        thread.start()
+        self.taskMgr.add(self.wait_lod_bam_file, 'wait_lod_bam_file', extraArgs=[future, filename], appendTask=True)
+
+    def wait_lod_bam_file(self, future, filename, task):
+        """Report the result of output_lod_bam_file when the thread has finished.
+        """
+        if not future.done():
+            return task.cont
+
+        if (e := future.exception()) is not None:
+            self.gui.show_dialog(f'{filename} cannot be written.\n{e}')
+            self.request_redraw()
+        else:
+            print(f'{filename} is written.')
+
+        return task.done
+
     def toggle_rotation(self):
         self.is_rotating = not self.is_rotating
 
-    def toggle_wireframe(self):
+    def cancel_build(self):
+        """Cancel the running build and keep the current model displayed.
+        """
+        if self.state == Status.BUILDING:
+            self.builder.cancel()
+            self.proxy_builder.cancel()
+            self.model_params = self.display_params
+            self.state = Status.SHOW_MODEL
+
+    def toggle_variants(self):
+        """Show the variants of the current shape in a grid, instead of the model.
+           The entries which have several values, such as '8,16,32' or '0:180:90',
+           are varied: the first one along the columns and the second one along the rows.
+        """
+        if self.variant_grid is not None:
+            self.close_variants()
+            return
+
+        if self.state != Status.SHOW_MODEL:
+            return
+
+        try:
+            fixed, varied = parse_variants(self.gui.get_input_values())
+        except ArgumentTypeError as e:
+            self.gui.show_dialog(str(e))
+            return
+
+        if not 1 <= len(varied) <= 2:
+            self.gui.show_dialog('Enter several values, such as 8,16,32 or 8:32:8,\n'
+                                 'in one or two boxes to compare variants.')
+            return
+
+        grid = make_variant_grid(varied)
+
+        if (cnt := sum(len(row) for row in grid)) > (limit := max_variants.get_value()):
+            self.gui.show_dialog(f'{cnt} variants exceed the limit of {limit}.')
+            return
+
+        cells = [[self.make_variant_cell(fixed, varied_params) for varied_params in row] for row in grid]
+
+        self.variant_grid = VariantGrid(self.render, self.gui.font, self.find_cached_model, self.cache_model)
+        self.variant_grid.root.set_color(LColor(1, 0, 0, 1))
+
         if self.show_wireframe:
-            self.model.set_render_mode_filled()
-        else:
-            self.model.set_render_mode_wireframe()
+            self.variant_grid.root.set_render_mode_wireframe()
+
+        self.variant_grid.show(self.model_name, cells)
+        self.model.hide()
+        self.wireframe.detach()
+        self.quality.invalidate()
+
+    def make_variant_cell(self, fixed, varied_params):
+        """Returns (label, validated parameters) of a variant;
+           the parameters are None if the variant is invalid or over the budgets.
+        """
+        label = '\n'.join(f'{name}={value}' for name, value in varied_params.items())
+
+        try:
+            params = validate(self.model_name, fixed | varied_params)
+        except ValidationError:
+            return f'{label}\n(invalid)', None
+
+        if check_budget(self.model_name, params):
+            return f'{label}\n(over budget)', None
+
+        return label, params
+
+    def close_variants(self):
+        if self.variant_grid is not None:
+            self.variant_grid.destroy()
+            self.variant_grid = None
+            self.model.show()
+            self.wireframe.attach(self.model)
+            self.quality.invalidate()
+
+    def change_quality(self):
+        name = self.quality.next_preset()
+        print(f'Render quality: {name}')
+
+    def toggle_live_preview(self):
+        self.live_preview = not self.live_preview
+
+    def input_changed(self, *args):
+        """Called whenever a character is typed or erased in an entry box.
+           The live preview starts after no keystroke for preview_delay seconds.
+        """
+        if self.live_preview:
+            self.taskMgr.remove('preview')
+            self.taskMgr.do_method_later(preview_delay.get_value(), self.start_preview, 'preview')
 
+    def start_preview(self, task):
+        if self.variant_grid is None and self.state in (Status.SHOW_MODEL, Status.BUILDING):
+            self.state = Status.PREVIEW_MODEL
+
+        return task.done
+
+    def toggle_wireframe(self):
         # self.toggle_wireframe()
         self.show_wireframe = not self.show_wireframe
+        self.wireframe.set_visible(self.show_wireframe)
+
+        if self.variant_grid is not None:
+            if self.show_wireframe:
+                self.variant_grid.root.set_render_mode_wireframe()
+            else:
+                self.variant_grid.root.set_render_mode_filled()
 
     def calc_aspect_ratio(self, display_region):
         """Args:
@@ -275,8 +586,8 @@ class ModelDisplay(ShowBase):
         directional_light.set_pos_hpr(Point3(0, 0, 50), Vec3(-30, -45, 0))
         # directional_light.node().show_frustom()
         self.render.set_light(directional_light)
-        directional_light.node().set_shadow_caster(True)
-        self.render.set_shader_auto()
+        # The shadows, the shader generator and antialiasing are set by the quality preset.
+        self.quality = RenderQuality(self.render, directional_light, self.win.get_gsg())
 
     def mouse_click(self):
         self.dragging = True
@@ -314,86 +625,352 @@ class ModelDisplay(ShowBase):
         self.model.set_hpr(angle)
 
     def change_model_types(self, model_name):
+        self.close_variants()
         self.model_name = model_name
         self.state = Status.REPLACE_CLASS
 
     def reflect_changes(self):
+        self.close_variants()
         self.state = Status.REPLACE_MODEL
 
-    def dispay_model(self, model, hpr=None, scale=4):
+    def dispay_model(self, model, model_name, params, hpr=None, scale=4):
+        # model_name and params are the shape and the validated parameters with which the model was built.
         # If hpr is None, inherit hpr from the current model and remove it.
         if hpr is None:
             hpr = self.model.get_hpr()
             self.model.remove_node()
 
         self.model = model
+        self.display_model_name = model_name
+        self.display_params = params
         hpr = self.model.get_hpr()
 
-        self.model.set_pos_hpr_scale(Point3(0, 0, 0), hpr, scale)
-        self.model.set_color(LColor(1, 0, 0, 1))
-        self.model.reparent_to(self.render)
+        with self.profiler.section('reparent'):
+            self.model.set_pos_hpr_scale(Point3(0, 0, 0), hpr, scale)
+            self.model.reparent_to(self.render)
 
-        if self.show_wireframe:
-            self.model.set_render_mode_wireframe()
+        with self.profiler.section('render_state'):
+            self.model.set_color(LColor(1, 0, 0, 1))
+
+        # The edges are drawn by the overlay over the filled model.
+        with self.profiler.section('wireframe'):
+            self.wireframe.attach(self.model)
+
+        vertices, triangles = count_geometry(self.model)
+        self.profiler.set_geometry(vertices, triangles)
+        self.quality.set_triangles(triangles)
+        self.update_stats()
+
+        # The buffers are uploaded to the GPU when the model is rendered first.
+        self.taskMgr.remove('update_stats')
+        self.taskMgr.do_method_later(0.5, lambda task: self.update_stats(), 'update_stats')
+
+    def get_model_stats(self):
+        """Returns geom_stats.ModelStats of the displayed model.
+        """
+        return get_model_stats(self.model, self.win.get_gsg())
+
+    def update_stats(self):
+        self.request_redraw()
+        self.stats_panel.set_stats(self.model_name, self.get_model_stats(), self.build_time, self.build_source)
+
+    def set_build_time(self, build_time, source):
+        self.build_time = build_time
+        self.build_source = source
+
+    def get_default_params(self):
+        default_params = get_default_params(self.model_name)
+        self.gui.set_params(self.model_name, get_param_names(self.model_name), default_params)
+        return default_params
 
     def create_new_model(self):
-        shape = SHAPES[self.model_name]
-        params = shape.validator()
-        default_params = params.model_dump()
-        self.gui.set_default_values(default_params)
-        model = shape.model(**default_params).create()
+        default_params = self.get_default_params()
+
+        if (model := self.find_cached_model(self.model_name, default_params)) is None:
+            start = time.perf_counter()
+
+            with self.profiler.section('create'):
+                model = create_model(self.model_name, default_params)
+
+            self.set_build_time(time.perf_counter() - start, 'built')
+            self.cache_model(self.model_name, default_params, model)
+        else:
+            self.set_build_time(0, 'cached')
+
+        self.model_params = default_params
+        return model
+
+    def find_cached_model(self, model_name, params):
+        """Returns the model built with the same parameters from the in-memory cache
+           or the bam file cache, or None if not cached.
+        """
+        key = ModelCache.make_key(SHAPES[model_name].model, params)
+
+        if (model := self.model_cache.get(key)) is None:
+            bam_key = self.bam_cache.make_key(model_name, params)
+
+            if (model := self.bam_cache.get(bam_key)) is not None:
+                self.model_cache.put(key, model)
+
         return model
 
+    def cache_model(self, model_name, params, model, data=None):
+        """Cache the model in memory, and write it to the bam file cache in a background thread.
+            Args:
+                data (bytes): the bam stream of the model if it has been received from a build process.
+        """
+        key = ModelCache.make_key(SHAPES[model_name].model, params)
+        self.model_cache.put(key, model)
+
+        bam_key = self.bam_cache.make_key(model_name, params)
+        self.bam_cache.put_async(bam_key, model, data)
+
+    def request_model(self, params, proxy=False):
+        """Display the model from the cache if it has been built with the same parameters,
+           otherwise start building it.
+            Args:
+                params (dict): validated parameters.
+                proxy (bool): if True, a model with fewer segments is also built
+                              to be displayed until the model is built.
+        """
+        with self.profiler.section('cache'):
+            model = self.find_cached_model(self.model_name, params)
+
+        self.model_params = params
+        self.proxy_builder.cancel()
+
+        if model is not None:
+            self.builder.cancel()
+            self.set_build_time(0, 'cached')
+            self.dispay_model(model, self.model_name, params)
+        elif self.display_model_name == self.model_name \
+                and (scale := get_scale(self.model_name, self.display_params, params)) is not None:
+            # Only lengths are changed, so rescaling the current vertices is enough.
+            self.builder.cancel()
+            start = time.perf_counter()
+
+            with self.profiler.section('rescale'):
+                self.rescale_model(params, scale)
+
+            self.set_build_time(time.perf_counter() - start, 'rescaled')
+            self.update_stats()
+        else:
+            self.builder.submit(self.model_name, params)
+
+            if proxy:
+                proxy_params = scale_segments(self.model_name, params, preview_proxy_scale.get_value())
+
+                if proxy_params != params:
+                    self.proxy_builder.submit(self.model_name, proxy_params)
+
+    def rescale_model(self, params, scale):
+        """Scale the vertices of the displayed model, and cache it as the model built with params.
+            Args:
+                params (dict): validated parameters.
+                scale (tuple): (sx, sy, sz)
+        """
+        rescale_model(self.model, scale)
+        self.wireframe.attach(self.model)
+        self.quality.invalidate()
+        self.display_params = params
+
+        # Cache the geometry without the transform and the render states set by dispay_model.
+        model = self.model.copy_to(NodePath())
+        model.clear_transform()
+        model.clear_color()
+        model.clear_render_mode()
+        self.cache_model(self.model_name, params, model)
+
+    def build_new_model(self):
+        """Show the model of the selected class with the values entered for it last time,
+           or with the default parameters if they cannot be built as they are.
+        """
+        default_params = self.get_default_params()
+
+        try:
+            params = validate(self.model_name, self.gui.get_input_values())
+        except ValidationError:
+            params = default_params
+        else:
+            if check_budget(self.model_name, params) or self.is_too_large(params):
+                params = default_params
+
+        self.request_model(params)
+
     def update_model(self):
+        """Validate the input values and show the model built with them.
+        """
         params = self.gui.get_input_values()
-        shape = SHAPES[self.model_name]
 
         try:
-            result = shape.validator(**params)
-            validated_params = result.model_dump()
-            new_model = shape.model(**validated_params).create()
+            with self.profiler.section('validate'):
+                validated_params = validate(self.model_name, params)
         except ValidationError as e:
             print(e.errors())
-            error_info = []
-            for err in e.errors():
-                error_info.append(f'{err['loc'][0]}: {err['input']}  {err['msg']}.')
-
+            error_info = format_errors(e)
             self.gui.show_dialog('\n'.join(error_info))
         else:
-            return new_model
+            if errors := check_budget(self.model_name, validated_params):
+                self.gui.show_dialog('\n'.join(errors))
+            elif self.is_too_large(validated_params):
+                self.confirm_build(validated_params)
+            else:
+                self.request_model(validated_params)
+
+    def is_too_large(self, params):
+        """Returns True if the model is estimated to have more triangles than triangle-warning
+           and is not cached.
+        """
+        return estimate(self.model_name, params).triangles > triangle_warning.get_value() \
+            and self.find_cached_model(self.model_name, params) is None
+
+    def confirm_build(self, params):
+        """Ask whether to build the large model. Nothing is built if the answer is No.
+        """
+        est = estimate(self.model_name, params)
+        msg = (f'{self.model_name} will have about {est.triangles:,} triangles and '
+               f'{est.vertices:,} vertices ({est.bytes / 1024 ** 2:,.0f} MB).\nBuild it anyway?')
+
+        def build(answer):
+            if answer:
+                self.request_model(params)
 
-        # ValidationError example:
-        # e.errors() -> [{'type': 'greater_than_equal', 'loc': ('slice_caps_radial',),
-        #                'msg': 'Input should be greater than or equal to 0', 'input': '-5',
-        #                'ctx': {'ge': 0}, 'url': 'https://errors.pydantic.dev/2.12/v/greater_than_equal'}]
+                if self.builder.is_building:
+                    self.state = Status.BUILDING
+
+        self.gui.show_confirm_dialog(msg, build)
+
+    def preview_model(self):
+        """Show the model built with the input values if they are valid.
+           Unlike update_model, errors are not shown, because the input is still being typed.
+        """
+        params = self.gui.get_input_values()
+
+        try:
+            with self.profiler.section('validate'):
+                validated_params = validate(self.model_name, params)
+        except ValidationError:
+            # The builds for the previous input values are no longer needed.
+            self.builder.cancel()
+            self.proxy_builder.cancel()
+            return
+
+        # Large models are built only when asked for with [Reflect Changes].
+        if check_budget(self.model_name, validated_params) or self.is_too_large(validated_params):
+            self.builder.cancel()
+            self.proxy_builder.cancel()
+            return
+
+        if validated_params != self.model_params:
+            self.request_model(validated_params, proxy=True)
+
+    def receive_proxy(self):
+        """Display the proxy model if it has been built before the model.
+        """
+        if (result := self.proxy_builder.poll()) is not None and not result.error:
+            with self.profiler.section('decode'):
+                model = decode_model(result.data)
+
+            self.set_build_time(result.build_time, 'proxy')
+            self.dispay_model(model, result.model_name, result.params)
+
+    def receive_model(self):
+        """Display the built model if the build has finished.
+           Returns True if the build has finished.
+        """
+        if (result := self.builder.poll()) is None:
+            return False
+
+        self.profiler.add_worker_event('create', result.build_time)
+        self.proxy_builder.cancel()
+        # The state is SHOW_MODEL from the next frame, so the result must be rendered explicitly.
+        self.request_redraw()
+
+        if result.error:
+            # The current model stays displayed.
+            self.model_params = self.display_params
+            self.gui.show_dialog(result.error)
+        else:
+            with self.profiler.section('decode'):
+                model = decode_model(result.data)
+
+            with self.profiler.section('cache'):
+                self.cache_model(result.model_name, result.params, model, result.data)
+
+            self.set_build_time(result.build_time, 'built')
+            self.dispay_model(model, result.model_name, result.params)
+
+        return True
+
+    def control_model(self, dt):
+        if self.is_rotating:
+            # The shadow of the rotating model changes every frame.
+            self.quality.invalidate()
+
+            if self.variant_grid is not None:
+                self.variant_grid.rotate(dt)
+            else:
+                self.rotate_model(dt)
+
+        if self.mw3d_node.has_mouse():
+            mouse_pos = self.mw3d_node.get_mouse()
+
+            if self.dragging:
+                if globalClock.get_frame_time() - self.dragging_start_time >= 0.2:
+                    self.rotate_camera(mouse_pos, dt)
 
     def update(self, task):
         dt = globalClock.get_dt()
 
+        with self.profiler.section(self.state.name):
+            self.update_state(dt)
+
+        if (redraw := self.needs_redraw()) != self.win.is_active():
+            # An inactive window is not rendered, but its events are still processed.
+            self.win.set_active(redraw)
+
+        if not redraw:
+            time.sleep(idle_sleep.get_value())
+            self.was_idle = True
+            return task.cont
+
+        self.redraw_frames = max(self.redraw_frames - 1, 0)
+        # The dt of the first frame after an idle period includes the sleep, so it is not measured.
+        self.quality.update(dt, measure=not self.was_idle)
+        self.was_idle = False
+        self.profiler.end_frame(dt)
+        return task.cont
+
+    def update_state(self, dt):
         match self.state:
 
             case Status.SHOW_MODEL:
-                if self.is_rotating:
-                    self.rotate_model(dt)
+                self.control_model(dt)
 
-                if self.mw3d_node.has_mouse():
-                    mouse_pos = self.mw3d_node.get_mouse()
-
-                    if self.dragging:
-                        if globalClock.get_frame_time() - self.dragging_start_time >= 0.2:
-                            self.rotate_camera(mouse_pos, dt)
+                if self.variant_grid is not None and self.variant_grid.poll(self.model_name):
+                    self.quality.invalidate()
+                    self.request_redraw()
 
             case Status.REPLACE_MODEL:
-                if model := self.update_model():
-                    self.dispay_model(model)
-                self.state = Status.SHOW_MODEL
+                self.update_model()
+                self.state = Status.BUILDING if self.builder.is_building else Status.SHOW_MODEL
 
             case Status.REPLACE_CLASS:
-                model = self.create_new_model()
-                self.dispay_model(model)
-                self.state = Status.SHOW_MODEL
+                self.build_new_model()
+                self.state = Status.BUILDING if self.builder.is_building else Status.SHOW_MODEL
 
-        return task.cont
+            case Status.PREVIEW_MODEL:
+                self.preview_model()
+                self.state = Status.BUILDING if self.builder.is_building else Status.SHOW_MODEL
+
+            case Status.BUILDING:
+                # Keep the current model rotating until the new one is built.
+                self.control_model(dt)
+                self.receive_proxy()
+
+                if self.receive_model():
+                    self.state = Status.SHOW_MODEL
+                    self.request_redraw()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,273 @@
+from collections import deque, namedtuple
+
+import numpy as np
+from panda3d.core import Geom, GeomTriangles, GeomVertexData, GeomVertexArrayFormat, GeomVertexFormat
+
+from geom_stats import iter_geom_nodes, calc_model_bytes
+from vertex_arrays import get_column, get_indices, get_rows
+
+
+OptimizeReport = namedtuple(
+    'OptimizeReport',
+    ['vertices_before', 'vertices_after', 'indices_before', 'indices_after', 'acmr_before', 'acmr_after']
+)
+
+CompactReport = namedtuple('CompactReport', ['bytes_before', 'bytes_after', 'formats'])
+
+
+def quantize(values, epsilon):
+    """Returns the cells of a spatial hash with the cell size epsilon."""
+    return np.round(values / epsilon).astype(np.int64)
+
+
+def count_cache_misses(geom, cache_size=32):
+    """Returns the number of vertices transformed to draw the geom, simulating
+       a FIFO post-transform vertex cache. Divided by the number of triangles,
+       it is the average cache miss ratio (ACMR).
+    """
+    indices = np.concatenate([get_indices(prim.decompose()) for prim in geom.get_primitives()])
+    cache = deque(maxlen=cache_size)
+    cached = set()
+    misses = 0
+
+    for i in indices.tolist():
+        if i not in cached:
+            misses += 1
+            if len(cache) == cache_size:
+                cached.discard(cache[0])
+            cache.append(i)
+            cached.add(i)
+
+    return misses
+
+
+def weld_vertices(vdata, epsilon, ignore=()):
+    """Returns (the indices of the unique vertices, the index of the unique vertex of each vertex,
+       the position id of each vertex). Vertices are merged if all their columns except ignore
+       are equal within epsilon, so by default the seams of normals and texcoords are kept.
+    """
+    fmt = vdata.get_format()
+    keys = []
+
+    for i in range(fmt.get_num_arrays()):
+        for column in fmt.get_array(i).get_columns():
+            if (name := column.get_name().get_name()) in ignore:
+                continue
+
+            values = get_column(vdata, name)
+
+            if values.dtype.kind == 'f':
+                keys.append(quantize(values, epsilon))
+            else:
+                keys.append(values.astype(np.int64))
+
+    positions = quantize(get_column(vdata, 'vertex')[:, :3], epsilon)
+    _, position_ids = np.unique(positions, axis=0, return_inverse=True)
+    _, unique, inverse = np.unique(np.hstack(keys), axis=0, return_index=True, return_inverse=True)
+
+    return unique, inverse.reshape(-1), position_ids.reshape(-1)
+
+
+def remove_degenerate(triangles, position_ids):
+    """Returns the triangles which do not have two corners at the same position."""
+    p = position_ids[triangles]
+    keep = (p[:, 0] != p[:, 1]) & (p[:, 1] != p[:, 2]) & (p[:, 2] != p[:, 0])
+    return triangles[keep]
+
+
+def reorder_triangles(triangles, vertices):
+    """Sort the triangles along a Morton curve of their centroids, so that neighboring
+       triangles, which share vertices, are drawn one after another.
+    """
+    if not len(triangles):
+        return triangles
+
+    centroids = vertices[triangles].mean(axis=1)
+    low, high = centroids.min(axis=0), centroids.max(axis=0)
+    cells = ((centroids - low) / np.maximum(high - low, 1e-12) * 1023).astype(np.uint64)
+
+    codes = np.zeros(len(triangles), dtype=np.uint64)
+    for bit in range(10):
+        for axis in range(3):
+            codes |= ((cells[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(bit * 3 + axis)
+
+    return triangles[np.argsort(codes, kind='stable')]
+
+
+def reorder_vertices(triangles, num_rows):
+    """Returns (the old index of each new vertex, the triangles with new indices);
+       the vertices are numbered in the order they are first used.
+    """
+    flat = triangles.reshape(-1)
+    _, first = np.unique(flat, return_index=True)
+    order = flat[np.sort(first)]
+    remap = np.zeros(num_rows, dtype=np.uint32)
+    remap[order] = np.arange(len(order), dtype=np.uint32)
+    return order, remap[triangles]
+
+
+def make_vertex_data(vdata, rows):
+    """Returns new GeomVertexData of the same format with the rows of vdata."""
+    new_vdata = GeomVertexData(vdata.get_name(), vdata.get_format(), Geom.UH_static)
+    new_vdata.unclean_set_num_rows(len(rows))
+
+    for i in range(vdata.get_num_arrays()):
+        get_rows(new_vdata.modify_array(i))[:] = get_rows(vdata.get_array(i))[rows]
+
+    return new_vdata
+
+
+def make_triangles(triangles):
+    prim = GeomTriangles(Geom.UH_static)
+    prim.set_index_type(Geom.NT_uint32)
+    array = prim.modify_vertices()
+    array.unclean_set_num_rows(triangles.size)
+    get_rows(array)[:] = triangles.astype(np.uint32).reshape(-1, 1).view(np.uint8)
+    return prim
+
+
+def optimize_geom(geom, epsilon, ignore=()):
+    """Returns a new Geom whose vertices are welded, degenerate triangles removed,
+       and triangles and vertices reordered for the vertex cache, or None if the geom
+       has primitives other than triangles, strips and fans.
+    """
+    prims = geom.get_primitives()
+
+    if not prims or any(prim.get_primitive_type() != Geom.PT_polygons for prim in prims):
+        return None
+
+    vdata = geom.get_vertex_data()
+    triangles = np.concatenate([get_indices(prim.decompose()).reshape(-1, 3) for prim in prims])
+
+    unique, inverse, position_ids = weld_vertices(vdata, epsilon, ignore)
+    triangles = remove_degenerate(inverse[triangles], position_ids[unique])
+    triangles = reorder_triangles(triangles, get_column(vdata, 'vertex')[unique, :3])
+    order, triangles = reorder_vertices(triangles, len(unique))
+
+    new_geom = Geom(make_vertex_data(vdata, unique[order]))
+    new_geom.add_primitive(make_triangles(triangles))
+    return new_geom
+
+
+def count_indices(geom):
+    return sum(prim.decompose().get_num_vertices() for prim in geom.get_primitives())
+
+
+def calc_acmr(misses, indices):
+    return misses / (indices // 3) if indices else 0
+
+
+def optimize_model(model, epsilon=1e-6, ignore=(), acmr=False):
+    """Optimize the geoms of the flattened model in place.
+       Returns OptimizeReport; the acmr values are None unless acmr is True.
+        Args:
+            model (NodePath): a model created by shapes.
+            epsilon (float): vertices closer than this are welded.
+            ignore (tuple): columns which may differ between welded vertices, e.g. ('texcoord',).
+            acmr (bool): if True, the average cache miss ratios are calculated.
+    """
+    counts = np.zeros(4, dtype=np.int64)
+    misses = np.zeros(2, dtype=np.int64)
+
+    for node in iter_geom_nodes(model):
+        for i in range(node.get_num_geoms()):
+            geom = node.get_geom(i)
+            counts[0] += geom.get_vertex_data().get_num_rows()
+            counts[2] += count_indices(geom)
+
+            if acmr:
+                misses[0] += count_cache_misses(geom)
+
+            if (new_geom := optimize_geom(geom, epsilon, ignore)) is not None:
+                node.set_geom(i, new_geom)
+                geom = new_geom
+
+            counts[1] += geom.get_vertex_data().get_num_rows()
+            counts[3] += count_indices(geom)
+
+            if acmr:
+                misses[1] += count_cache_misses(geom)
+
+    acmr_before = calc_acmr(misses[0], counts[2]) if acmr else None
+    acmr_after = calc_acmr(misses[1], counts[3]) if acmr else None
+
+    return OptimizeReport(*counts.tolist(), acmr_before, acmr_after)
+
+
+def format_report(report):
+    lines = [
+        f'vertices {report.vertices_before:,} -> {report.vertices_after:,}',
+        f'indices {report.indices_before:,} -> {report.indices_after:,}',
+    ]
+
+    if report.acmr_before is not None:
+        lines.append(f'acmr {report.acmr_before:.3f} -> {report.acmr_after:.3f}')
+
+    return '  '.join(lines)
+
+
+def format_compact_report(report):
+    return f'bytes {report.bytes_before:,} -> {report.bytes_after:,}'
+
+
+def make_compact_format(fmt, drop):
+    """Returns a registered GeomVertexFormat which has all the columns of fmt except drop
+       interleaved in one array. float64 columns are stored as float32.
+    """
+    array_format = GeomVertexArrayFormat()
+
+    for i in range(fmt.get_num_arrays()):
+        for column in fmt.get_array(i).get_columns():
+            if column.get_name().get_name() in drop:
+                continue
+
+            numeric_type = column.get_numeric_type()
+
+            if numeric_type == Geom.NT_float64:
+                numeric_type = Geom.NT_float32
+
+            array_format.add_column(
+                column.get_name(), column.get_num_components(), numeric_type, column.get_contents()
+            )
+
+    return GeomVertexFormat.register_format(GeomVertexFormat(array_format))
+
+
+def compact_geom(geom, drop):
+    """Returns a copy of the geom whose vertex data is converted to the compact format
+       and whose primitives use the narrowest index type for the number of vertices.
+    """
+    vdata = geom.get_vertex_data()
+    new_geom = geom.make_copy()
+    new_geom.set_vertex_data(vdata.convert_to(make_compact_format(vdata.get_format(), drop)))
+
+    # uint8 indices are not supported well by GPUs, so uint16 is the narrowest.
+    index_type = Geom.NT_uint16 if vdata.get_num_rows() <= 0xffff else Geom.NT_uint32
+
+    for i in range(new_geom.get_num_primitives()):
+        prim = new_geom.modify_primitive(i)
+
+        if prim.is_indexed():
+            prim.set_index_type(index_type)
+
+    return new_geom
+
+
+def compact_model(model, drop=('color',)):
+    """Convert the geoms of the flattened model in place to compact vertex formats
+       and narrow index types. Returns CompactReport.
+        Args:
+            model (NodePath): a model created by shapes.
+            drop (tuple): columns to be removed. The color of exported models is set
+                          with set_color, so the color column is dropped by default.
+    """
+    bytes_before = calc_model_bytes(model)
+    formats = set()
+
+    for node in iter_geom_nodes(model):
+        for i in range(node.get_num_geoms()):
+            geom = compact_geom(node.get_geom(i), drop)
+            node.set_geom(i, geom)
+            formats.add(geom.get_vertex_data().get_format())
+
+    return CompactReport(bytes_before, calc_model_bytes(model), [*formats])
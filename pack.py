@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import struct
+import sys
+
+from panda3d.core import Filename
+
+from builder import decode_model
+
+
+# A pack file is the magic, the bam streams of the models one after another,
+# the index as json, and the footer, which has the offset and the size of the index.
+# The index is written last, so models can be added as they are built
+# without holding them in memory.
+MAGIC = b'P3DPACK1'
+FOOTER = struct.Struct('<QQ8s')
+
+
+class PackWriter:
+    """Write many models into a single pack file. Use as a context manager;
+       the index is written when the writer is closed.
+        Args:
+            filename (str): the pack file to write.
+            append (bool): if True and the file exists, the models are added to those in it;
+                           otherwise the file is overwritten.
+    """
+
+    def __init__(self, filename, append=False):
+        if append and os.path.exists(filename) and os.path.getsize(filename):
+            # The new models are written over the old index, which is rewritten on close.
+            with PackReader(filename) as reader:
+                self.index = reader.index
+                offset = reader.index_offset
+
+            self.file = open(filename, 'r+b')
+            self.file.seek(offset)
+            self.file.truncate()
+        else:
+            self.file = open(filename, 'wb')
+            self.file.write(MAGIC)
+            self.index = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def add(self, name, data, **info):
+        """Append a model serialized with encode_to_bam_stream.
+            Args:
+                name (str): the name to load the model with; must be unique in the pack.
+                data (bytes): the bam stream.
+                info: json serializable values stored in the index, like shape and params.
+        """
+        if name in self.index:
+            raise ValueError(f'{name} is already in the pack')
+
+        offset = self.file.tell()
+        self.file.write(data)
+        self.index[name] = dict(offset=offset, size=len(data), **info)
+
+    def add_model(self, name, model, **info):
+        self.add(name, model.encode_to_bam_stream(), **info)
+
+    def close(self):
+        if self.file.closed:
+            return
+
+        offset = self.file.tell()
+        index = json.dumps(self.index).encode('utf-8')
+        self.file.write(index)
+        self.file.write(FOOTER.pack(offset, len(index), MAGIC))
+        self.file.close()
+
+
+class PackReader:
+    """Read models from a pack file. Only the index is read when opened,
+       and each model is read from its offset when loaded.
+        Args:
+            filename (str): the pack file to read.
+    """
+
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+
+        try:
+            if self.file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'{filename} is not a pack file')
+
+            if self.file.seek(0, 2) < len(MAGIC) + FOOTER.size:
+                raise ValueError(f'{filename} has no index; it may not have been closed')
+
+            self.file.seek(-FOOTER.size, 2)
+            offset, size, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+
+            if magic != MAGIC:
+                raise ValueError(f'{filename} has no index; it may not have been closed')
+
+            self.file.seek(offset)
+            self.index = json.loads(self.file.read(size))
+            self.index_offset = offset
+        except Exception:
+            self.file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def names(self):
+        return self.index.keys()
+
+    def get_info(self, name):
+        return self.index[name]
+
+    def read(self, name):
+        """Returns the bam stream of the model."""
+        entry = self.index[name]
+        self.file.seek(entry['offset'])
+        return self.file.read(entry['size'])
+
+    def load(self, name):
+        """Returns the model as a NodePath."""
+        return decode_model(self.read(name))
+
+    def close(self):
+        self.file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List or extract the models in a pack file.')
+    parser.add_argument('pack', help='a pack file')
+    parser.add_argument('names', nargs='*', help='the models to extract as bam files; all if -a is given')
+    parser.add_argument('-a', '--all', action='store_true', help='extract all the models')
+    parser.add_argument('-o', '--output-dir', default='.', help='the directory to write bam files')
+    args = parser.parse_args(argv)
+
+    with PackReader(args.pack) as reader:
+        names = [*reader.names()] if args.all else args.names
+
+        if not names:
+            for name in reader.names():
+                print(json.dumps(dict(name=name) | reader.get_info(name)))
+            return 0
+
+        for name in names:
+            if name not in reader:
+                print(f'{name} is not in the pack', file=sys.stderr)
+                return 1
+
+            output = Filename.from_os_specific(f'{args.output_dir}/{name}.bam')
+            reader.load(name).write_bam_file(output)
+            print(output.to_os_specific())
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import json
+import sqlite3
+import time
+import zlib
+from collections import namedtuple
+
+from panda3d.core import ConfigVariableString
+
+from builder import decode_model
+
+
+preset_file = ConfigVariableString(
+    'preset-file', 'presets.sqlite3',
+    'The SQLite file which stores the presets and the values entered in the editor.'
+)
+
+
+# params: validated parameters; the geometry is loaded separately with PresetStore.load_model.
+Preset = namedtuple('Preset', ['id', 'name', 'shape', 'params', 'created', 'has_geometry'])
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS presets (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    shape TEXT NOT NULL,
+    params TEXT NOT NULL,
+    created REAL NOT NULL,
+    geometry BLOB
+);
+CREATE INDEX IF NOT EXISTS presets_shape ON presets (shape, created);
+
+-- The numeric parameters of the presets, indexed for range searches.
+CREATE TABLE IF NOT EXISTS preset_values (
+    preset_id INTEGER NOT NULL REFERENCES presets (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (preset_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS preset_values_range ON preset_values (name, value);
+
+-- The values entered in the editor for each shape, restored when the editor starts.
+CREATE TABLE IF NOT EXISTS session (
+    shape TEXT PRIMARY KEY,
+    entered TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class PresetStore:
+    """Store presets, which are validated parameters of a shape with their geometry,
+       and the values entered in the editor, in an SQLite file.
+        Args:
+            filename (str): the SQLite file; created if it does not exist.
+    """
+
+    def __init__(self, filename=None):
+        self.conn = sqlite3.connect(filename or preset_file.get_value())
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def save(self, model_name, params, model=None, name=None):
+        """Save the parameters, and the model if given, as a preset. Returns its id.
+            Args:
+                model_name (str): a key of SHAPES.
+                params (dict): validated parameters.
+                model (NodePath): the model built with params.
+                name (str): the name of the preset; if None, like 'torus_3'.
+        """
+        geometry = None if model is None else zlib.compress(model.encode_to_bam_stream(), 1)
+
+        with self.conn:
+            if name is None:
+                cnt, = self.conn.execute('SELECT COUNT(*) FROM presets WHERE shape = ?', (model_name,)).fetchone()
+                name = f'{model_name}_{cnt + 1}'
+
+            cursor = self.conn.execute(
+                'INSERT INTO presets (name, shape, params, created, geometry) VALUES (?, ?, ?, ?, ?)',
+                (name, model_name, json.dumps(params), time.time(), geometry)
+            )
+            preset_id = cursor.lastrowid
+
+            # bool is a subclass of int, so flags can be searched as 0 or 1.
+            self.conn.executemany(
+                'INSERT INTO preset_values (preset_id, name, value) VALUES (?, ?, ?)',
+                [(preset_id, k, float(v)) for k, v in params.items() if isinstance(v, (int, float))]
+            )
+
+        return preset_id
+
+    def delete(self, preset_id):
+        with self.conn:
+            self.conn.execute('DELETE FROM presets WHERE id = ?', (preset_id,))
+
+    def make_preset(self, row):
+        preset_id, name, shape, params, created, has_geometry = row
+        return Preset(preset_id, name, shape, json.loads(params), created, bool(has_geometry))
+
+    def get(self, preset_id):
+        """Returns Preset, or None if not found."""
+        row = self.conn.execute(
+            'SELECT id, name, shape, params, created, geometry IS NOT NULL FROM presets WHERE id = ?',
+            (preset_id,)
+        ).fetchone()
+
+        return None if row is None else self.make_preset(row)
+
+    def search(self, model_name=None, limit=None, **ranges):
+        """Returns a list of Preset, the newest first. The geometry is not read.
+            Args:
+                model_name (str): if given, only the presets of the shape are returned.
+                limit (int): the maximum number of the presets.
+                ranges: parameter name=(low, high); the value must be in the range, inclusive.
+                        None means no bound, e.g. segs_c=(16, None).
+        """
+        sql = ['SELECT p.id, p.name, p.shape, p.params, p.created, p.geometry IS NOT NULL FROM presets p']
+        conditions = []
+        args = []
+
+        for i, (name, (low, high)) in enumerate(ranges.items()):
+            sql.append(f'JOIN preset_values v{i} ON v{i}.preset_id = p.id AND v{i}.name = ?')
+            args.append(name)
+
+            if low is not None:
+                conditions.append(f'v{i}.value >= ?')
+                args.append(low)
+            if high is not None:
+                conditions.append(f'v{i}.value <= ?')
+                args.append(high)
+
+        if model_name is not None:
+            conditions.append('p.shape = ?')
+            args.append(model_name)
+
+        if conditions:
+            sql.append('WHERE ' + ' AND '.join(conditions))
+
+        sql.append('ORDER BY p.created DESC, p.id DESC')
+
+        if limit is not None:
+            sql.append('LIMIT ?')
+            args.append(limit)
+
+        return [self.make_preset(row) for row in self.conn.execute(' '.join(sql), args)]
+
+    def load_model(self, preset_id):
+        """Returns the model saved with the preset as a NodePath, or None if it has no geometry.
+        """
+        row = self.conn.execute('SELECT geometry FROM presets WHERE id = ?', (preset_id,)).fetchone()
+
+        if row is None or row[0] is None:
+            return None
+
+        return decode_model(zlib.decompress(row[0]))
+
+    def save_session(self, entered, model_name):
+        """Save the values entered in the editor and the selected shape.
+            Args:
+                entered (dict): {shape: {parameter name: entered text}}
+                model_name (str): the selected shape.
+        """
+        now = time.time()
+
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO session (shape, entered, updated) VALUES (?, ?, ?)',
+                [(shape, json.dumps(values), now) for shape, values in entered.items()]
+            )
+            self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('shape', ?)", (model_name,))
+
+    def load_session(self):
+        """Returns the values entered in the editor last time as {shape: {parameter name: entered text}},
+           and the shape selected last time, or None.
+        """
+        rows = self.conn.execute('SELECT shape, entered FROM session').fetchall()
+        row = self.conn.execute("SELECT value FROM settings WHERE key = 'shape'").fetchone()
+        return {shape: json.loads(values) for shape, values in rows}, row and row[0]
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from collections import deque, defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from direct.gui.OnscreenText import OnscreenText
+from panda3d.core import ConfigVariableBool, TextNode, LColor
+
+
+show_frame_profiler = ConfigVariableBool(
+    'show-frame-profiler', False,
+    'If true, the editor starts with the frame profiler overlay shown.'
+)
+
+
+WORKER_TID = 0
+
+
+class FrameProfiler:
+    """Record the time of sections of each frame, and show them on an overlay.
+       The recorded events can be exported as a Chrome trace json file,
+       which can be opened with chrome://tracing or https://ui.perfetto.dev.
+        Args:
+            parent (NodePath): the parent of the overlay text.
+            font (TextFont): the font of the overlay text.
+            max_events (int): the number of the latest events kept for export.
+    """
+
+    def __init__(self, parent, font, max_events=100_000):
+        self.enabled = show_frame_profiler.get_value()
+        self.events = deque(maxlen=max_events)
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.origin = time.perf_counter()
+
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.last_times = {}
+        self.frames = 0
+        self.frame_time = 0
+        self.vertices = 0
+        self.triangles = 0
+
+        self.text = OnscreenText(
+            parent=parent,
+            pos=(-0.56, 0.85),
+            scale=0.04,
+            fg=LColor(1, 1, 0, 1),
+            bg=LColor(0, 0, 0, 0.8),
+            font=font,
+            align=TextNode.ALeft,
+            mayChange=True
+        )
+        self.text.hide()
+        self.show(self.enabled)
+
+    def show(self, enabled):
+        self.enabled = enabled
+
+        if enabled:
+            self.text.show()
+        else:
+            self.text.hide()
+
+    def toggle(self):
+        self.show(not self.enabled)
+
+    def timestamp(self, t):
+        """Convert perf_counter time to microseconds from the start."""
+        return (t - self.origin) * 1_000_000
+
+    def add_event(self, name, start, duration, tid=None):
+        """Args:
+            start (float): perf_counter time at which the event started.
+            duration (float): seconds.
+        """
+        self.events.append(dict(
+            name=name,
+            ph='X',
+            ts=self.timestamp(start),
+            dur=duration * 1_000_000,
+            pid=self.pid,
+            tid=self.tid if tid is None else tid
+        ))
+        self.totals[name] += duration
+        self.counts[name] += 1
+        self.last_times[name] = duration
+
+    def section(self, name):
+        """Returns a context manager that records the time of the with block.
+        """
+        if not self.enabled:
+            return nullcontext()
+
+        return self.record(name)
+
+    @contextmanager
+    def record(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_event(name, start, time.perf_counter() - start)
+
+    def add_worker_event(self, name, duration):
+        """Record an event which has just finished in the build worker process.
+        """
+        if self.enabled:
+            self.add_event(name, time.perf_counter() - duration, duration, tid=WORKER_TID)
+
+    def set_geometry(self, vertices, triangles):
+        """Set the numbers of the vertices and triangles submitted to the GPU each frame.
+        """
+        self.vertices = vertices
+        self.triangles = triangles
+
+    def end_frame(self, dt):
+        if not self.enabled:
+            return
+
+        self.frames += 1
+        self.frame_time = dt
+        self.events.append(dict(
+            name='vertices', ph='C', ts=self.timestamp(time.perf_counter()),
+            pid=self.pid, args=dict(vertices=self.vertices)
+        ))
+
+        # Updating the text every frame would itself take time.
+        if self.frames % 10 == 0:
+            self.update_text()
+
+    def update_text(self):
+        lines = [
+            f'frame {self.frame_time * 1000:.1f} ms ({1 / max(self.frame_time, 1e-6):.0f} fps)',
+            f'vertices {self.vertices:,}  triangles {self.triangles:,}',
+        ]
+
+        for name, duration in self.last_times.items():
+            avg = self.totals[name] / self.counts[name]
+            lines.append(f'{name:<14} last {duration * 1000:8.2f} ms  avg {avg * 1000:8.2f} ms')
+
+        self.text.setText('\n'.join(lines))
+
+    def export(self, filename=None):
+        """Write the recorded events to a Chrome trace json file.
+           Returns the file name.
+        """
+        if filename is None:
+            num = datetime.now().strftime('%Y%m%d%H%M%S')
+            filename = f'trace_{num}.json'
+
+        metadata = [
+            dict(name='thread_name', ph='M', pid=self.pid, tid=self.tid, args=dict(name='main')),
+            dict(name='thread_name', ph='M', pid=self.pid, tid=WORKER_TID, args=dict(name='build worker'))
+        ]
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(dict(traceEvents=[*metadata, *self.events], displayTimeUnit='ms'), f)
+
+        return filename
@@ -0,0 +1,185 @@
+from collections import namedtuple
+
+from panda3d.core import AntialiasAttrib, ConfigVariableBool, ConfigVariableDouble, ConfigVariableInt
+from panda3d.core import ConfigVariableString
+
+
+# shadow_sizes: the shadow map sizes which the adaptive quality steps through, from the lowest.
+# multisamples: the samples of the framebuffer, which can be set only before the window opens.
+# Without them, set_antialias(AntialiasAttrib.M_auto) appears to have no effect.
+Preset = namedtuple('Preset', ['shadows', 'shadow_sizes', 'multisamples', 'antialias'])
+
+PRESETS = {
+    'low': Preset(False, (), 0, False),
+    'medium': Preset(True, (256, 512, 1024), 2, True),
+    'high': Preset(True, (512, 1024, 2048), 4, True),
+}
+
+render_quality = ConfigVariableString(
+    'render-quality', 'medium',
+    'The preset of the shadow and antialiasing quality: low, medium or high. '
+    'low turns off the shadows, the shader generator and antialiasing for low-end machines.'
+)
+
+adaptive_quality = ConfigVariableBool(
+    'adaptive-quality', True,
+    'If true, the shadow map size and antialiasing are lowered while frames take longer than '
+    'target-frame-time, and raised again while they are fast enough.'
+)
+
+target_frame_time = ConfigVariableDouble(
+    'target-frame-time', 1 / 30,
+    'The frame time in seconds which the adaptive quality tries to keep.'
+)
+
+heavy_triangles = ConfigVariableInt(
+    'heavy-triangles', 2_000_000,
+    'Models with more triangles than this start with the lowest shadow map size of the preset.'
+)
+
+
+def get_preset(name=None):
+    return PRESETS.get(name or render_quality.get_value(), PRESETS['medium'])
+
+
+def get_prc_data(preset=None):
+    """Returns the config of the framebuffer for the preset,
+       to be loaded before the window is opened.
+    """
+    preset = preset or get_preset()
+    return f'framebuffer-multisample {int(preset.multisamples > 0)}\nmultisamples {preset.multisamples}\n'
+
+
+class RenderQuality:
+    """Manage the quality of the shadows and antialiasing.
+       The shadow map is rendered only when the scene changes, and its size and
+       antialiasing are adapted to the frame time and the number of triangles.
+        Args:
+            render (NodePath): the root of the scene.
+            light (NodePath): the shadow-casting DirectionalLight.
+            gsg (GraphicsStateGuardian): the gsg of the window.
+    """
+
+    # Seconds for which the frame time must stay over or under the target before the level changes.
+    down_delay = 1.0
+    up_delay = 3.0
+
+    def __init__(self, render, light, gsg):
+        self.render = render
+        self.light = light
+        self.gsg = gsg
+        self.shadow_buffer = None
+        self.dirty = True
+        self.slow_time = 0
+        self.fast_time = 0
+        self.avg_frame_time = 0
+        self.set_preset(render_quality.get_value())
+
+    @property
+    def max_level(self):
+        # The levels are the shadow sizes, and one more with antialiasing.
+        return len(self.preset.shadow_sizes) + int(self.preset.antialias)
+
+    def set_preset(self, name):
+        self.name = name if name in PRESETS else 'medium'
+        self.preset = PRESETS[self.name]
+        self.level = self.max_level
+        self.apply()
+
+    def next_preset(self):
+        """Switch to the next preset. Returns its name. The multisamples of the
+           framebuffer do not change until the editor is restarted.
+        """
+        names = [*PRESETS]
+        self.set_preset(names[(names.index(self.name) + 1) % len(names)])
+        return self.name
+
+    def set_triangles(self, triangles):
+        """Start a heavy model with the lowest shadow map size; the adaptive quality raises it
+           if the frames are fast enough.
+        """
+        if triangles > heavy_triangles.get_value() and self.level > 1:
+            self.level = 1
+            self.apply()
+
+        self.invalidate()
+
+    def apply(self):
+        sizes = self.preset.shadow_sizes
+
+        if self.preset.shadows:
+            size = sizes[min(self.level, len(sizes)) - 1]
+            self.light.node().set_shadow_caster(True, size, size)
+            self.render.set_shader_auto()
+        else:
+            self.light.node().set_shadow_caster(False)
+            self.render.clear_shader()
+
+        if self.preset.antialias and self.level > len(sizes):
+            self.render.set_antialias(AntialiasAttrib.M_auto)
+        else:
+            self.render.set_antialias(AntialiasAttrib.M_none)
+
+        # The shadow buffer is recreated with the new size.
+        self.shadow_buffer = None
+        self.invalidate()
+
+    def invalidate(self):
+        """Render the shadow map in the next frame, because the model or the light has changed.
+        """
+        self.dirty = True
+
+    def update_shadow(self):
+        if not self.preset.shadows:
+            return
+
+        if (buffer := self.light.node().get_shadow_buffer(self.gsg)) is None:
+            return
+
+        if buffer != self.shadow_buffer:
+            # A new buffer renders its first frame by itself.
+            self.shadow_buffer = buffer
+            buffer.set_one_shot(True)
+            self.dirty = False
+        elif self.dirty:
+            buffer.set_one_shot(True)
+            self.dirty = False
+
+    def adapt(self, dt):
+        """Lower the level while the frames are slower than the target,
+           and raise it while they are faster than half the target.
+        """
+        # Long hitches, like opening the window or a dialog, are not measured.
+        if dt > 1.0:
+            return
+
+        self.avg_frame_time += (dt - self.avg_frame_time) * 0.1
+        target = target_frame_time.get_value()
+
+        if self.avg_frame_time > target:
+            self.slow_time += dt
+            self.fast_time = 0
+        elif self.avg_frame_time < target * 0.5:
+            self.fast_time += dt
+            self.slow_time = 0
+        else:
+            self.slow_time = self.fast_time = 0
+
+        if self.slow_time > self.down_delay and self.level > 1:
+            self.level -= 1
+            self.slow_time = 0
+            self.apply()
+        elif self.fast_time > self.up_delay and self.level < self.max_level:
+            self.level += 1
+            self.fast_time = 0
+            self.apply()
+
+    def update(self, dt, measure=True):
+        """Args:
+            dt (float): the time of the last frame.
+            measure (bool): if False, dt is not used to adapt the level.
+        """
+        if measure and adaptive_quality.get_value():
+            self.adapt(dt)
+
+        self.update_shadow()
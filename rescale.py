@@ -0,0 +1,134 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from geom_stats import iter_geom_nodes
+from vertex_arrays import get_column
+
+
+# axes: {field name: the axes along which the geometry is proportional to the field}
+#       The fields sharing the same axes must change by the same ratio.
+# coupled: lengths which affect all axes, like thickness. The axes can be scaled
+#          independently only if they are zero; otherwise all the lengths must
+#          change by the same ratio, which is a uniform scale.
+ScaleRule = namedtuple('ScaleRule', ['axes', 'coupled'])
+
+
+SCALE_RULES = {
+    'cone': ScaleRule(
+        dict(bottom_radius='xy', top_radius='xy', bottom_inner_radius='xy', top_inner_radius='xy',
+             height='z'),
+        []
+    ),
+    'cylinder': ScaleRule(dict(radius='xy', inner_radius='xy', height='z'), []),
+    'torus': ScaleRule(dict(ring_radius='xyz', section_radius='xyz', section_inner_radius='xyz'), []),
+    'sphere': ScaleRule(dict(radius='xyz', inner_radius='xyz'), []),
+    'box': ScaleRule(dict(width='x', depth='y', height='z'), ['thickness']),
+    'triangle': ScaleRule(
+        dict(adjacent='xy', opposite='xy', inner_adjacent='xy', inner_opposite='xy', height='z'),
+        []
+    ),
+    'plane': ScaleRule(dict(width='x', depth='y'), []),
+    'capsule': ScaleRule(dict(radius='xyz', inner_radius='xyz', height='xyz'), []),
+    'capsule_prism': ScaleRule(dict(width='xy', depth='xy', height='z'), ['thickness']),
+    'elliptical_prism': ScaleRule(dict(major_axis='xy', minor_axis='xy', thickness='xy', height='z'), []),
+    'rounded_corner_box': ScaleRule(dict(width='x', depth='y', height='z'), ['corner_radius', 'thickness']),
+    'rounded_edge_box': ScaleRule(dict(width='x', depth='y', height='z'), ['corner_radius', 'thickness']),
+    'ellipsoid': ScaleRule(dict(major_axis='xyz', minor_axis='xyz', thickness='xyz'), []),
+}
+
+
+def get_ratio(fields, old_params, new_params):
+    """Returns the ratio by which all the fields change, 1 if they are all zero,
+       or None if they change by different ratios.
+    """
+    ratio = None
+
+    for name in fields:
+        old, new = old_params[name], new_params[name]
+
+        if old == new == 0:
+            continue
+
+        if old == 0 or new == 0:
+            return None
+
+        if ratio is None:
+            ratio = new / old
+        elif not math.isclose(ratio, new / old, rel_tol=1e-9):
+            return None
+
+    return 1 if ratio is None else ratio
+
+
+def get_scale(model_name, old_params, new_params):
+    """Returns (sx, sy, sz) if the geometry built with new_params is that built with
+       old_params scaled along the axes, otherwise None.
+        Args:
+            model_name (str): a key of SHAPES.
+            old_params (dict): validated parameters of the current geometry.
+            new_params (dict): validated parameters.
+    """
+    if (rule := SCALE_RULES.get(model_name)) is None:
+        return None
+
+    # The parameters of another shape, like those of the model displayed before the shape is changed.
+    if old_params.keys() != new_params.keys():
+        return None
+
+    lengths = [*rule.axes.keys(), *rule.coupled]
+    changed = [name for name in new_params if new_params[name] != old_params[name]]
+
+    # Segment counts and flags change the topology.
+    if not changed or any(name not in lengths for name in changed):
+        return None
+
+    if all(old_params[name] == new_params[name] == 0 for name in rule.coupled):
+        scale = [1, 1, 1]
+
+        for axes in set(rule.axes.values()):
+            fields = [name for name, v in rule.axes.items() if v == axes]
+
+            if (ratio := get_ratio(fields, old_params, new_params)) is None:
+                return None
+
+            for axis in axes:
+                scale['xyz'.index(axis)] = ratio
+
+        return tuple(scale)
+
+    if (ratio := get_ratio(lengths, old_params, new_params)) is None:
+        return None
+
+    return (ratio, ratio, ratio)
+
+
+def rescale_model(model, scale):
+    """Scale the vertices of the model in place, and correct the normals
+       if the scale is not uniform.
+        Args:
+            model (NodePath): a model created by shapes.
+            scale (tuple): (sx, sy, sz)
+    """
+    scale = np.array(scale, dtype=np.float32)
+    uniform = np.all(scale == scale[0])
+
+    for node in iter_geom_nodes(model):
+        for i in range(node.get_num_geoms()):
+            # Geoms shared with cached models are copied on write.
+            vdata = node.modify_geom(i).modify_vertex_data()
+            vertices = get_column(vdata, 'vertex', writable=True)
+            vertices[:, :3] *= scale
+
+            if uniform:
+                continue
+
+            if (normals := get_column(vdata, 'normal', writable=True)) is not None:
+                normals /= scale
+                normals /= np.linalg.norm(normals, axis=1, keepdims=True).clip(1e-12)
+
+            for name in ('tangent', 'binormal'):
+                if (vectors := get_column(vdata, name, writable=True)) is not None:
+                    vectors[:, :3] *= scale
+                    vectors[:, :3] /= np.linalg.norm(vectors[:, :3], axis=1, keepdims=True).clip(1e-12)
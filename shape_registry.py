@@ -0,0 +1,126 @@
+import importlib
+from functools import cache, cached_property
+
+
+class Shape:
+    """A model class of shapes and its validator, which are imported on first use,
+       so that listing the shapes does not load all of them.
+        Args:
+            model_name (str): the class name in shapes.
+            validator_name (str): the class name in validators.
+    """
+
+    def __init__(self, model_name, validator_name):
+        self.model_name = model_name
+        self.validator_name = validator_name
+
+    @cached_property
+    def model(self):
+        return getattr(importlib.import_module('shapes'), self.model_name)
+
+    @cached_property
+    def validator(self):
+        return getattr(importlib.import_module('validators'), self.validator_name)
+
+
+SHAPES = {
+    'cone': Shape('Cone', 'ConeValidator'),
+    'cylinder': Shape('Cylinder', 'CylinderValidator'),
+    'torus': Shape('Torus', 'TorusValidator'),
+    'sphere': Shape('Sphere', 'SphereValidator'),
+    'box': Shape('Box', 'BoxValidator'),
+    'triangle': Shape('RightTriangularPrism', 'RightTriangularPrismValidator'),
+    'plane': Shape('Plane', 'PlaneValidator'),
+    'capsule': Shape('Capsule', 'CapsuleValidator'),
+    'capsule_prism': Shape('CapsulePrism', 'CapsulePrismValidator'),
+    'elliptical_prism': Shape('EllipticalPrism', 'EllipticalPrismValidator'),
+    'rounded_corner_box': Shape('RoundedCornerBox', 'RoundedCornerBoxValidator'),
+    'rounded_edge_box': Shape('RoundedEdgeBox', 'RoundedEdgeBoxValidator'),
+    'ellipsoid': Shape('Ellipsoid', 'EllipsoidValidator'),
+}
+
+
+def validate(model_name, params):
+    """Returns the validated parameters as a dict.
+       Raises ValidationError if the parameters do not meet the conditions.
+        Args:
+            model_name (str): a key of SHAPES.
+            params (dict): {parameter name: its value,,,,}
+    """
+    result = SHAPES[model_name].validator(**params)
+    return result.model_dump()
+
+
+@cache
+def validate_defaults(model_name):
+    return SHAPES[model_name].validator().model_dump()
+
+
+def get_default_params(model_name):
+    """Returns a copy of the default parameters, which are validated only once.
+        Args:
+            model_name (str): a key of SHAPES.
+    """
+    return dict(validate_defaults(model_name))
+
+
+@cache
+def get_param_names(model_name):
+    """Returns a tuple of the parameter names in the order of the fields of the validator.
+        Args:
+            model_name (str): a key of SHAPES.
+    """
+    return tuple(SHAPES[model_name].validator.model_fields)
+
+
+@cache
+def get_segment_fields(model_name):
+    """Returns a tuple of the names of the fields which determine the number of segments,
+       e.g. segs_c, segs_top_cap (alias segs_tc) and slice_caps_radial (alias segs_sc_r).
+        Args:
+            model_name (str): a key of SHAPES.
+    """
+    validator = SHAPES[model_name].validator
+
+    return tuple(name for name, field in validator.model_fields.items()
+                 if name.startswith('segs') or (field.alias or '').startswith('segs'))
+
+
+def scale_segments(model_name, params, factor):
+    """Returns a copy of the parameters whose segment counts are multiplied by factor.
+       The counts do not fall below the lower bounds of the fields, and zero stays zero,
+       because it means that the part, such as a cap, has no segments.
+        Args:
+            model_name (str): a key of SHAPES.
+            params (dict): validated parameters.
+            factor (float): the scale of the segment counts.
+    """
+    fields = SHAPES[model_name].validator.model_fields
+    scaled = dict(params)
+
+    for name in get_segment_fields(model_name):
+        if not params[name]:
+            continue
+
+        lower = 1
+        for m in fields[name].metadata:
+            if (ge := getattr(m, 'ge', None)) is not None:
+                lower = max(lower, ge)
+            elif (gt := getattr(m, 'gt', None)) is not None:
+                lower = max(lower, gt + 1)
+
+        scaled[name] = max(round(params[name] * factor), lower)
+
+    return scaled
+
+
+def format_errors(e):
+    """Returns a list of error messages to be displayed.
+        Args:
+            e (ValidationError): an error raised by a validator.
+    """
+    # ValidationError example:
+    # e.errors() -> [{'type': 'greater_than_equal', 'loc': ('slice_caps_radial',),
+    #                'msg': 'Input should be greater than or equal to 0', 'input': '-5',
+    #                'ctx': {'ge': 0}, 'url': 'https://errors.pydantic.dev/2.12/v/greater_than_equal'}]
+    return [f'{err['loc'][0]}: {err['input']}  {err['msg']}.' for err in e.errors()]
@@ -0,0 +1,201 @@
+import argparse
+import itertools
+import json
+import sys
+import time
+from pathlib import Path
+
+from panda3d.core import Filename
+from pydantic import ValidationError
+
+from batch import Job, build_job, run_jobs, write_to_pack
+from budget import check_budget
+from geom_stats import count_geometry
+from pack import PackWriter
+from shape_registry import SHAPES, validate, format_errors
+
+
+def parse_value(text):
+    for tp in (int, float):
+        try:
+            return tp(text)
+        except ValueError:
+            pass
+
+    return text
+
+
+def parse_param(text):
+    """Parse a parameter specification and returns its name and values.
+       'segs_c=8:128:8' is a range including the stop value (8, 16, ... 128),
+       and 'radius=0.5,1,2' is a list of values.
+    """
+    name, sep, values = text.partition('=')
+
+    if not sep or not name or not values:
+        raise argparse.ArgumentTypeError(f'{text}: must be name=start:stop:step or name=v1,v2,...')
+
+    if ':' in values:
+        try:
+            start, stop, step = (parse_value(v) for v in values.split(':'))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'{text}: a range must be start:stop:step')
+
+        if not all(isinstance(v, (int, float)) for v in (start, stop, step)) or step <= 0:
+            raise argparse.ArgumentTypeError(f'{text}: a range must be numbers with a positive step')
+
+        cnt = int((stop - start) / step + 1e-9) + 1
+        return name, [start + step * i for i in range(cnt)]
+
+    return name, [parse_value(v) for v in values.split(',')]
+
+
+def check_param_names(model_name, params):
+    """Raise ValueError if a parameter is not a field of the validator, or its alias.
+       The validators ignore unknown fields, so a misspelled name would build the default model.
+        Args:
+            params (list): [(parameter name, [values]),,,,]
+    """
+    fields = SHAPES[model_name].validator.model_fields
+    names = {*fields, *(field.alias for field in fields.values() if field.alias)}
+
+    if unknown := [name for name, _ in params if name not in names]:
+        raise ValueError(f'{model_name} has no parameter {", ".join(unknown)}; '
+                         f'the parameters are {", ".join(fields)}')
+
+
+def expand(params):
+    """Yield dicts of all combinations of the parameter values.
+        Args:
+            params (list): [(parameter name, [values]),,,,]
+    """
+    names = [name for name, _ in params]
+
+    for values in itertools.product(*(values for _, values in params)):
+        yield dict(zip(names, values))
+
+
+def build_variant(job):
+    """Build the model with batch.build_job and write it to a bam file.
+       Returns a dict of the geometry statistics and the build time.
+    """
+    start = time.perf_counter()
+    result, model = build_job(job)
+    build_time = time.perf_counter() - start
+
+    if model is None:
+        return result
+
+    if not model.write_bam_file(Filename.from_os_specific(job.output)):
+        return result | dict(status='error', errors=[f'cannot write {job.output}'])
+
+    vertices, triangles = count_geometry(model)
+    return result | dict(vertices=vertices, triangles=triangles, build_time=build_time)
+
+
+def build_variant_data(job):
+    """Build the model like build_variant, but return it as a bam stream in the result
+       to be added to a pack file.
+    """
+    start = time.perf_counter()
+    result, model = build_job(job)
+    build_time = time.perf_counter() - start
+
+    if model is None:
+        return result
+
+    vertices, triangles = count_geometry(model)
+    return result | dict(vertices=vertices, triangles=triangles, build_time=build_time,
+                         data=model.encode_to_bam_stream())
+
+
+def sweep(model_name, params, output_dir, max_workers=None, writer=None):
+    """Validate all combinations of the parameter values before building any of them,
+       then build the valid ones in worker processes.
+       Returns a list of dicts of the results, sorted by index.
+        Args:
+            model_name (str): a key of SHAPES.
+            params (list): [(parameter name, [values]),,,,]
+            output_dir (str): the directory to write bam files.
+            writer (PackWriter): if given, the models are added to it instead of written to bam files.
+    """
+    check_param_names(model_name, params)
+    output_dir = Path(output_dir)
+    jobs = []
+    results = []
+
+    # Validate all combinations at once with array operations, then validate only
+    # the valid ones with pydantic to get their parameters.
+    combinations = [*expand(params)]
+    columns = {name: [combination[name] for combination in combinations] for name, _ in params}
+    batch = SHAPES[model_name].validator.validate_batch(columns)
+
+    for i, combination in enumerate(combinations):
+        if not batch.valid[i]:
+            results.append(dict(index=i, status='invalid', params=combination, errors=batch.get_messages(i)))
+            continue
+
+        try:
+            validated_params = validate(model_name, combination)
+        except ValidationError as e:
+            results.append(dict(index=i, status='invalid', params=combination, errors=format_errors(e)))
+            continue
+
+        if errors := check_budget(model_name, validated_params):
+            results.append(dict(index=i, status='rejected', params=combination, errors=errors))
+            continue
+
+        name = f'{model_name}_{i:05d}'
+        output = name if writer is not None else str(output_dir / f'{name}.bam')
+        jobs.append(Job(i, model_name, validated_params, output))
+
+    print(f'{len(jobs)} valid, {len(results)} invalid or over-budget combinations', file=sys.stderr)
+
+    if writer is not None:
+        built = write_to_pack(run_jobs(jobs, build_variant_data, max_workers), writer)
+    else:
+        built = run_jobs(jobs, build_variant, max_workers)
+
+    for result in built:
+        print(json.dumps(result), flush=True)
+        results.append(result)
+
+    return sorted(results, key=lambda result: result['index'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Build models for all combinations of parameter values.'
+    )
+    parser.add_argument('shape', choices=SHAPES.keys())
+    parser.add_argument('params', nargs='+', type=parse_param,
+                        help='name=start:stop:step (the stop is included) or name=v1,v2,...')
+    parser.add_argument('-o', '--output-dir', default='sweep', help='the directory to write bam files')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='the number of worker processes')
+    parser.add_argument('-p', '--pack', help='write all the models to this pack file instead of bam files')
+    args = parser.parse_args(argv)
+
+    try:
+        check_param_names(args.shape, args.params)
+    except ValueError as e:
+        parser.error(str(e))
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.pack:
+        with PackWriter(args.pack) as writer:
+            results = sweep(args.shape, args.params, output_dir, args.jobs, writer)
+    else:
+        results = sweep(args.shape, args.params, output_dir, args.jobs)
+
+    manifest = dict(shape=args.shape, params=dict(args.params), models=results)
+
+    with open(output_dir / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,284 @@
+import argparse
+import json
+import math
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+from panda3d.core import load_prc_file_data
+from panda3d.core import AmbientLight, DirectionalLight, Camera, PerspectiveLens, NodePath
+from panda3d.core import FrameBufferProperties, WindowProperties, GraphicsPipe, GraphicsOutput
+from panda3d.core import GraphicsEngine, GraphicsPipeSelection, Texture
+from panda3d.core import PNMImage, PNMTextMaker, StringStream, Filename
+from panda3d.core import LColor, Point3, Vec3
+
+from batch import Job, build_job, run_jobs, read_spec
+from export import load_source
+from pack import PackReader
+from shape_registry import SHAPES
+from sweep import parse_param, check_param_names, expand
+
+
+FONT_FILE = 'fonts/DejaVuSans.ttf'
+LABEL_HEIGHT = 16
+
+
+class ThumbnailRenderer:
+    """Render models to images in an offscreen buffer without opening a window.
+       The buffer, the camera and the lights are created once and reused for all the models.
+        Args:
+            size (int): the width and height of the images in pixels.
+    """
+
+    def __init__(self, size):
+        self.engine = GraphicsEngine.get_global_ptr()
+        pipe = GraphicsPipeSelection.get_global_ptr().make_default_pipe()
+
+        fb_props = FrameBufferProperties()
+        fb_props.set_rgb_color(True)
+        fb_props.set_rgba_bits(8, 8, 8, 8)
+        fb_props.set_depth_bits(24)
+
+        self.buffer = self.engine.make_output(
+            pipe, 'thumbnail', 0, fb_props, WindowProperties.size(size, size),
+            GraphicsPipe.BF_refuse_window
+        )
+
+        if self.buffer is None:
+            raise RuntimeError('cannot open an offscreen buffer')
+
+        # The rendered image is copied to the RAM of the texture every frame.
+        self.texture = Texture()
+        self.buffer.add_render_texture(self.texture, GraphicsOutput.RTM_copy_ram)
+        self.buffer.set_clear_color(LColor(0.6, 0.6, 0.6, 1))
+
+        self.render = NodePath('render')
+        self.setup_light()
+
+        self.lens = PerspectiveLens()
+        self.lens.set_fov(40)
+        self.lens.set_aspect_ratio(1)
+        self.camera = self.render.attach_new_node(Camera('camera', self.lens))
+
+        region = self.buffer.make_display_region()
+        region.set_camera(self.camera)
+
+    def setup_light(self):
+        ambient_light = self.render.attach_new_node(AmbientLight('ambient_light'))
+        ambient_light.node().set_color(LColor(0.6, 0.6, 0.6, 1.0))
+        self.render.set_light(ambient_light)
+
+        directional_light = self.render.attach_new_node(DirectionalLight('directional_light'))
+        directional_light.node().set_color(LColor(1, 1, 1, 1))
+        directional_light.set_hpr(Vec3(-30, -45, 0))
+        self.render.set_light(directional_light)
+
+    def look_at(self, model):
+        """Place the camera so that the whole model is seen from the same direction as in the editor.
+        """
+        if (bounds := model.get_tight_bounds()) is None:
+            return
+
+        low, high = bounds
+        center = (low + high) / 2
+        radius = max((high - low).length() / 2, 1e-3)
+        distance = radius / math.sin(math.radians(self.lens.get_min_fov() / 2)) * 1.05
+
+        direction = Vec3(1, -1, 0.5).normalized()
+        self.lens.set_near_far(distance * 0.01, distance + radius * 2)
+        self.camera.set_pos(center + direction * distance)
+        self.camera.look_at(Point3(center))
+
+    def render_model(self, model):
+        """Returns the image of the model as PNMImage.
+        """
+        model.reparent_to(self.render)
+        model.set_color(LColor(1, 0, 0, 1))
+        self.look_at(model)
+
+        self.engine.render_frame()
+        image = PNMImage()
+        self.texture.store(image)
+
+        model.remove_node()
+        return image
+
+
+renderer = None
+
+
+def get_renderer(size, display=None):
+    """Returns the renderer of this process, which is created on first use.
+        Args:
+            display (str): if given, the value of 'load-display', e.g. 'p3headlessgl'.
+    """
+    global renderer
+
+    if renderer is None:
+        if display:
+            load_prc_file_data('', f'load-display {display}\naux-display {display}\n')
+        renderer = ThumbnailRenderer(size)
+
+    return renderer
+
+
+def render_thumbnail(job, size=128, display=None):
+    """Create the model of the job, or load it if job.params has 'source', and render it.
+       Returns a dict of the result with the image as png data.
+    """
+    start = time.perf_counter()
+
+    if 'source' in job.params:
+        result = dict(index=job.index, shape=job.model_name, output=job.output, status='ok')
+        model = load_source(job.params['source'])
+    else:
+        result, model = build_job(job)
+
+        if model is None:
+            return result
+
+    image = get_renderer(size, display).render_model(model)
+    stream = StringStream()
+    image.write(stream, 'thumbnail.png')
+
+    return result | dict(time=time.perf_counter() - start, image=stream.get_data())
+
+
+class ContactSheets:
+    """Arrange the thumbnails in the order of the job indices on contact sheets,
+       and write each sheet as soon as all its thumbnails have arrived.
+        Args:
+            output_dir (str): the directory to write the png files.
+            size (int): the size of the thumbnails.
+            cols, rows (int): the numbers of the thumbnails in a row and in a column of a sheet.
+            total (int): the number of the thumbnails.
+    """
+
+    def __init__(self, output_dir, size, cols, rows, total):
+        self.output_dir = Path(output_dir)
+        self.size = size
+        self.cols = cols
+        self.rows = rows
+        self.per_sheet = cols * rows
+        self.total = total
+        self.sheets = {}
+        self.counts = {}
+        self.written = []
+
+        self.text_maker = PNMTextMaker(Filename.from_os_specific(FONT_FILE), 0)
+        self.text_maker.set_pixel_size(LABEL_HEIGHT * 0.7)
+        self.text_maker.set_align(PNMTextMaker.A_center)
+        self.text_maker.set_fg(LColor(1, 1, 1, 1))
+
+    def get_sheet(self, sheet_no):
+        if (sheet := self.sheets.get(sheet_no)) is None:
+            cnt = min(self.per_sheet, self.total - sheet_no * self.per_sheet)
+            rows = -(-cnt // self.cols)
+            sheet = PNMImage(self.cols * self.size, rows * (self.size + LABEL_HEIGHT), 3)
+            sheet.fill(0.2, 0.2, 0.2)
+            self.sheets[sheet_no] = sheet
+            self.counts[sheet_no] = cnt
+
+        return sheet
+
+    def add(self, index, label, data=None):
+        """Args:
+            index (int): the index of the job.
+            label (str): the text written below the thumbnail.
+            data (bytes): the png data of the thumbnail, or None if it could not be rendered.
+        """
+        sheet_no, i = divmod(index, self.per_sheet)
+        sheet = self.get_sheet(sheet_no)
+        row, col = divmod(i, self.cols)
+        x, y = col * self.size, row * (self.size + LABEL_HEIGHT)
+
+        if data is not None:
+            image = PNMImage()
+            image.read(StringStream(data))
+            sheet.copy_sub_image(image, x, y)
+
+        self.text_maker.generate_into(label, sheet, x + self.size // 2, y + self.size + int(LABEL_HEIGHT * 0.8))
+        self.counts[sheet_no] -= 1
+
+        if not self.counts[sheet_no]:
+            self.write(sheet_no)
+
+    def write(self, sheet_no):
+        filename = self.output_dir / f'thumbnails_{sheet_no:03d}.png'
+        self.sheets.pop(sheet_no).write(Filename.from_os_specific(str(filename)))
+        self.written.append(str(filename))
+
+
+def make_jobs(sources, sweep_spec=None):
+    """Returns a list of jobs from json lines spec files, pack files and a sweep
+       specification [shape, name=values,,,,].
+    """
+    jobs = []
+
+    for source in sources:
+        if Path(source).suffix == '.pack':
+            with PackReader(source) as reader:
+                names = [*reader.names()]
+
+            jobs.extend(Job(0, name, dict(source=[source, name]), name) for name in names)
+        else:
+            jobs.extend(job._replace(output=Path(job.output).stem) for job in read_spec(source, ''))
+
+    if sweep_spec:
+        model_name, *specs = sweep_spec
+
+        if model_name not in SHAPES:
+            raise ValueError(f'unknown shape {model_name}')
+
+        params = [parse_param(spec) for spec in specs]
+        check_param_names(model_name, params)
+        jobs.extend(Job(0, model_name, combination, f'{model_name}_{i:05d}')
+                    for i, combination in enumerate(expand(params)))
+
+    return [job._replace(index=i) for i, job in enumerate(jobs)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Render thumbnails of models offscreen in parallel and arrange them on png contact sheets.'
+    )
+    parser.add_argument('sources', nargs='*', help='json lines spec files as in batch.py, or pack files')
+    parser.add_argument('-s', '--sweep', nargs='+', metavar='ARG',
+                        help='a shape and parameter values as in sweep.py, e.g. torus segs_r=8:64:8')
+    parser.add_argument('-o', '--output-dir', default='thumbnails', help='the directory to write contact sheets')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='the number of worker processes')
+    parser.add_argument('--size', type=int, default=128, help='the size of a thumbnail in pixels')
+    parser.add_argument('--cols', type=int, default=8, help='the number of thumbnails in a row of a sheet')
+    parser.add_argument('--rows', type=int, default=8, help='the number of rows of a sheet')
+    parser.add_argument('--display', help="the display module, e.g. p3headlessgl on a server without X")
+    args = parser.parse_args(argv)
+
+    if not args.sources and not args.sweep:
+        parser.error('give spec files, pack files or --sweep')
+
+    try:
+        jobs = make_jobs(args.sources, args.sweep)
+    except (ValueError, argparse.ArgumentTypeError) as e:
+        parser.error(str(e))
+
+    Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    sheets = ContactSheets(args.output_dir, args.size, args.cols, args.rows, len(jobs))
+    func = partial(render_thumbnail, size=args.size, display=args.display)
+    failed = 0
+
+    for result in run_jobs(jobs, func, args.jobs):
+        data = result.pop('image', None)
+        label = result['output'] if result['status'] == 'ok' else f"{result['output']} ({result['status']})"
+        sheets.add(result['index'], label, data)
+
+        if result['status'] != 'ok':
+            failed += 1
+        print(json.dumps(result), flush=True)
+
+    print(f'{len(sheets.written)} contact sheets are written to {args.output_dir}.', file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,35 @@
-from .cylindrical_shape_validators import CylinderValidator, CapsuleValidator
-from .torus_validator import TorusValidator
-from .elliptical_shape_validators import EllipsoidValidator, EllipticalPrismValidator
-from .box_shape_validators import BoxValidator, RoundedCornerBoxValidator, RoundedEdgeBoxValidator
-from .sphere_validator import SphereValidator
-from .cone_validator import ConeValidator
-from .capsule_prism_validator import CapsulePrismValidator
-from .plane_validator import PlaneValidator
-from .right_triangular_prism_validator import RightTriangularPrismValidator
+import importlib
+
+
+# The validators are imported on first access, because building their schemas
+# takes time and most runs use only a few of them.
+VALIDATORS = {
+    'CylinderValidator': 'cylindrical_shape_validators',
+    'CapsuleValidator': 'cylindrical_shape_validators',
+    'TorusValidator': 'torus_validator',
+    'EllipsoidValidator': 'elliptical_shape_validators',
+    'EllipticalPrismValidator': 'elliptical_shape_validators',
+    'BoxValidator': 'box_shape_validators',
+    'RoundedCornerBoxValidator': 'box_shape_validators',
+    'RoundedEdgeBoxValidator': 'box_shape_validators',
+    'SphereValidator': 'sphere_validator',
+    'ConeValidator': 'cone_validator',
+    'CapsulePrismValidator': 'capsule_prism_validator',
+    'PlaneValidator': 'plane_validator',
+    'RightTriangularPrismValidator': 'right_triangular_prism_validator',
+}
+
+__all__ = [*VALIDATORS]
+
+
+def __getattr__(name):
+    if (module := VALIDATORS.get(name)) is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    validator = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = validator
+    return validator
+
+
+def __dir__():
+    return [*globals(), *VALIDATORS]
@@ -1,10 +1,172 @@
+from collections import namedtuple
+
+import numpy as np
 from pydantic import BaseModel, ConfigDict
 
 
+class BatchResult(namedtuple('BatchResult', ['valid', 'errors', 'codes'])):
+    """The result of validate_batch.
+        valid (numpy.ndarray): bool mask of the valid rows.
+        errors (numpy.ndarray): uint64 error bits of each row; bit i means codes[i].
+        codes (list): error messages.
+    """
+
+    def get_messages(self, row):
+        bits = int(self.errors[row])
+        return [code for i, code in enumerate(self.codes) if bits >> i & 1]
+
+
+# The strings which pydantic accepts as bool in lax mode.
+BOOL_STRINGS = {
+    '0': False, 'off': False, 'f': False, 'false': False, 'n': False, 'no': False,
+    '1': True, 'on': True, 't': True, 'true': True, 'y': True, 'yes': True
+}
+
+
+def to_bool(value):
+    """Returns the value converted to bool like pydantic, or None if it cannot be converted.
+    """
+    if isinstance(value, str):
+        return BOOL_STRINGS.get(value.lower())
+
+    if isinstance(value, (int, float, np.bool_, np.number)) and value in (0, 1):
+        return bool(value)
+
+    return None
+
+
+def to_float(value):
+    """Returns the value converted to float like pydantic, or None if it cannot be converted.
+    """
+    if isinstance(value, (str, int, float, np.bool_, np.number)):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+
+    return None
+
+
+# The messages of pydantic for a value of a wrong type, and for a value which cannot be parsed.
+TYPE_ERRORS = {
+    int: ('Input should be a valid integer', 'Input should be a valid integer, unable to parse string as an integer'),
+    float: ('Input should be a valid number', 'Input should be a valid number, unable to parse string as a number'),
+    bool: ('Input should be a valid boolean', 'Input should be a valid boolean, unable to interpret input'),
+}
+
+
+def convert_column(values, annotation):
+    """Returns the values as an array of float64, or bool if annotation is bool, and
+       {error message: mask of the rows which cannot be converted}.
+        Args:
+            values (list): the values of a field.
+            annotation (type): int, float or bool.
+    """
+    if annotation is not bool:
+        # Most columns are numbers, which are converted at once.
+        try:
+            return np.asarray(values, dtype=np.float64), {}
+        except (TypeError, ValueError):
+            pass
+
+    convert, dtype = (to_bool, bool) if annotation is bool else (to_float, np.float64)
+    column = np.zeros(len(values), dtype=dtype)
+    wrong_type = np.zeros(len(values), dtype=bool)
+    unparsed = np.zeros(len(values), dtype=bool)
+
+    for i, value in enumerate(values):
+        if (converted := convert(value)) is not None:
+            column[i] = converted
+        elif isinstance(value, (str, int, float, np.bool_, np.number)):
+            unparsed[i] = True
+        else:
+            wrong_type[i] = True
+
+    errors = dict(zip(TYPE_ERRORS[annotation], (wrong_type, unparsed)))
+    return column, {msg: mask for msg, mask in errors.items() if mask.any()}
+
+
 class ShapeBase(BaseModel):
 
     model_config = ConfigDict(
         validate_by_name=True,
         validate_by_alias=True,
-        extra='ignore'
-    )
\ No newline at end of file
+        extra='ignore',
+        # The schema is built when the validator is used first, not when imported.
+        defer_build=True
+    )
+
+    @classmethod
+    def batch_rules(cls, cols):
+        """Returns the cross-field rules as {error message: mask of the rows violating it}.
+           Subclasses with field_validators override this with the same conditions as array operations.
+            Args:
+                cols (dict): {field name: numpy.ndarray}
+        """
+        return {}
+
+    @classmethod
+    def validate_batch(cls, columns):
+        """Validate many parameter sets at once with array operations.
+           Fields which are not in columns have their default values.
+            Args:
+                columns (dict): {field name or alias: array of the values of each row}
+        """
+        size = len(next(iter(columns.values())))
+        cols = {}
+        checks = {}
+        unconverted = np.zeros(size, dtype=bool)
+
+        for name, field in cls.model_fields.items():
+            if name in columns:
+                values = columns[name]
+            elif field.alias in columns:
+                values = columns[field.alias]
+            else:
+                # Default values are valid.
+                cols[name] = np.full(size, field.default, dtype=bool if field.annotation is bool else np.float64)
+                continue
+
+            # Like pydantic, the rows with values which cannot be converted are invalid,
+            # and the other checks of the field are not reported for them.
+            cols[name], type_errors = convert_column(values, field.annotation)
+            v = cols[name]
+            converted = np.ones(size, dtype=bool)
+
+            for msg, mask in type_errors.items():
+                checks[f'{name}: {msg}'] = mask
+                converted &= ~mask
+
+            unconverted |= ~converted
+
+            if field.annotation is bool:
+                continue
+
+            if field.annotation is int:
+                checks[f'{name}: must be an integer'] = (v != np.floor(v)) & converted
+
+            # NaN violates every bound, because the comparisons are False.
+            for m in field.metadata:
+                if (gt := getattr(m, 'gt', None)) is not None:
+                    checks[f'{name}: must be greater than {gt}'] = ~(v > gt) & converted
+                if (ge := getattr(m, 'ge', None)) is not None:
+                    checks[f'{name}: must be greater than or equal to {ge}'] = ~(v >= ge) & converted
+                if (lt := getattr(m, 'lt', None)) is not None:
+                    checks[f'{name}: must be less than {lt}'] = ~(v < lt) & converted
+                if (le := getattr(m, 'le', None)) is not None:
+                    checks[f'{name}: must be less than or equal to {le}'] = ~(v <= le) & converted
+
+        # Like pydantic, which does not validate default values, a rule is checked only
+        # if the field named at the head of its message is given.
+        for msg, mask in cls.batch_rules(cols).items():
+            name = msg.split(':')[0]
+
+            if name in columns or cls.model_fields[name].alias in columns:
+                checks[msg] = mask & ~unconverted
+
+        errors = np.zeros(size, dtype=np.uint64)
+
+        for i, mask in enumerate(checks.values()):
+            errors |= mask.astype(np.uint64) << np.uint64(i)
+
+        return BatchResult(errors == 0, errors, [*checks.keys()])
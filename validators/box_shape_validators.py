@@ -1,3 +1,4 @@
+import numpy as np
 from pydantic import field_validator, Field, ValidationInfo
 from pydantic_core import PydanticCustomError, ValidationError, InitErrorDetails
 
@@ -6,6 +7,17 @@ from .base_validator import ShapeBase
 
 class BoxBaseValidator(ShapeBase):
 
+    @classmethod
+    def batch_rules(cls, cols):
+        keys = ('width', 'depth', 'height')
+        thickness = cols['thickness']
+        min_length = np.minimum.reduce([cols[k] for k in keys])
+
+        return {
+            f'thickness: must be thickness x 2 < min({list(keys)})':
+                (thickness > 0) & (thickness * 2 >= min_length)
+        }
+
     @field_validator('thickness', check_fields=False, mode='after')
     @classmethod
     def validate_thickness(cls, thickness: float, info: ValidationInfo):
@@ -51,6 +63,30 @@ class BoxValidator(BoxBaseValidator):
 
 class RoundedBoxValidator(BoxBaseValidator):
 
+    @classmethod
+    def batch_rules(cls, cols):
+        keys = ['width', 'depth']
+
+        if cls.__name__ == 'RoundedEdgeBoxValidator':
+            keys.append('height')
+
+        corner_radius = cols['corner_radius']
+        thickness = cols['thickness']
+
+        rules = {
+            f'corner_radius: must be corner_radius x 2 < min({keys})':
+                corner_radius * 2 >= np.minimum.reduce([cols[k] for k in keys])
+        }
+
+        # The thickness of the box without rounded corners is validated the same as BoxValidator.
+        for msg, mask in super().batch_rules(cols).items():
+            rules[msg] = mask & (corner_radius == 0)
+
+        rules['thickness: must be thickness <= corner_radius'] = \
+            (corner_radius != 0) & (thickness > corner_radius)
+
+        return rules
+
     @field_validator('corner_radius', check_fields=False, mode='after')
     @classmethod
     def validate_corner_radius(cls, corner_radius: float, info: ValidationInfo):
@@ -19,6 +19,12 @@ class CapsulePrismValidator(ShapeBase):
     open_bottom: bool = False
     invert: bool = False
 
+    @classmethod
+    def batch_rules(cls, cols):
+        return {
+            'thickness: must be thickness x 2 < depth': cols['thickness'] * 2 >= cols['depth']
+        }
+
     @field_validator('thickness', mode='after')
     @classmethod
     def validate_thickness(cls, thickness: float, info: ValidationInfo):
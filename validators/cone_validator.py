@@ -21,6 +21,14 @@ class ConeValidator(ShapeBase):
     slice_caps_axial: int = Field(ge=0, alias='segs_sc_a', default=2)
     invert: bool = False
 
+    @classmethod
+    def batch_rules(cls, cols):
+        return {
+            f'{name}: must be {name} <= {target_name}': cols[name] > cols[target_name]
+            for name, target_name in [('bottom_inner_radius', 'bottom_radius'),
+                                      ('top_inner_radius', 'top_radius')]
+        }
+
     @field_validator('bottom_inner_radius', 'top_inner_radius', mode='after')
     @classmethod
     def validate_inner_radius(cls, v: float, info: ValidationInfo):
@@ -6,6 +6,12 @@ from .base_validator import ShapeBase
 
 class InnerRadiusValidator(ShapeBase):
 
+    @classmethod
+    def batch_rules(cls, cols):
+        return {
+            'inner_radius: must be inner_radius <= radius': cols['inner_radius'] > cols['radius']
+        }
+
     @field_validator('inner_radius', check_fields=False, mode='after')
     @classmethod
     def validate_inner_radius(cls, inner_radius: float, info: ValidationInfo):
@@ -1,3 +1,4 @@
+import numpy as np
 from pydantic import field_validator, Field, ValidationInfo
 from pydantic_core import PydanticCustomError, ValidationError, InitErrorDetails
 
@@ -19,6 +20,15 @@ class EllipticalPrismValidator(ShapeBase):
     slice_caps_axial: int = Field(alias='segs_sc_a', ge=0, default=2)
     invert: bool = False
 
+    @classmethod
+    def batch_rules(cls, cols):
+        min_axis = np.minimum(cols['major_axis'], cols['minor_axis'])
+
+        return {
+            'thickness: must be thickness x 2 <= min(major_axis, minor_axis)':
+                cols['thickness'] * 2 > min_axis
+        }
+
     @field_validator('thickness', mode='after')
     @classmethod
     def validate_thickness(cls, thickness: float, info: ValidationInfo):
@@ -56,6 +66,15 @@ class EllipsoidValidator(ShapeBase):
     segs_slice_caps: int = Field(alias="segs_sc", ge=0, default=2)
     invert: bool = False
 
+    @classmethod
+    def batch_rules(cls, cols):
+        half = np.minimum(cols['major_axis'], cols['minor_axis']) / 2
+
+        return {
+            'thickness: must be thickness x 2 <= (top_clip - bottom_clip) x min(minor_axis, major_axis) / 2':
+                cols['thickness'] * 2 > (cols['top_clip'] - cols['bottom_clip']) * half
+        }
+
     @field_validator('thickness', mode='after')
     @classmethod
     def validate_thickness(cls, thickness: float, info: ValidationInfo):
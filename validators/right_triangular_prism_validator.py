@@ -18,13 +18,20 @@ class RightTriangularPrismValidator(ShapeBase):
     slice_caps_axial: int = Field(alias="segs_sc_a", ge=0, default=1)
     invert: bool = False
 
+    @classmethod
+    def batch_rules(cls, cols):
+        return {
+            f'{name}: must be {name} <= {target_name}': cols[name] > cols[target_name]
+            for name, target_name in [('inner_adjacent', 'adjacent'), ('inner_opposite', 'opposite')]
+        }
+
     @field_validator('inner_adjacent', 'inner_opposite', mode='after')
     @classmethod
     def validate_inner(cls, v: float, info: ValidationInfo):
         target_name = info.field_name.replace('inner_', '')
         if target_name in info.data and v > info.data[target_name]:
             error_details = InitErrorDetails(
-                PydanticCustomError(
+                type=PydanticCustomError(
                     'value_error',
                     f'must be {info.field_name} <= {target_name}'
                 ),
@@ -35,7 +42,7 @@ class RightTriangularPrismValidator(ShapeBase):
 
             raise ValidationError.from_exception_data(
                 title=cls.__name__,
-                line_errors=error_details
+                line_errors=[error_details]
             )
 
         return v
\ No newline at end of file
@@ -6,6 +6,12 @@ from .cylindrical_shape_validators import InnerRadiusValidator
 
 class SphericalValidator(InnerRadiusValidator):
 
+    @classmethod
+    def batch_rules(cls, cols):
+        rules = super().batch_rules(cols)
+        rules['top_clip: must be top_clip >= bottom_clip'] = cols['top_clip'] < cols['bottom_clip']
+        return rules
+
     @field_validator('top_clip', check_fields=False, mode='after')
     @classmethod
     def validate_top_clip(cls, top_clip: float, info: ValidationInfo):
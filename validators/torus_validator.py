@@ -19,6 +19,15 @@ class TorusValidator(ShapeBase):
     ring_slice_end_cap: int = Field(alias='segs_rsec', ge=0, default=2)
     invert: bool = False
 
+    @classmethod
+    def batch_rules(cls, cols):
+        return {
+            'section_radius: section_radius <= ring_radius':
+                cols['section_radius'] > cols['ring_radius'],
+            'section_inner_radius: section_inner_radius <= section_radius':
+                cols['section_inner_radius'] > cols['section_radius']
+        }
+
     @field_validator('section_radius', mode='after')
     @classmethod
     def validate_ring_radius(cls, section_radius: float, info: ValidationInfo):
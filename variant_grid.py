@@ -0,0 +1,192 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from panda3d.core import ConfigVariableInt, LColor, Point3, TextNode
+
+from builder import build_model, decode_model
+from sweep import parse_param
+
+
+max_variants = ConfigVariableInt(
+    'max-variants', 64,
+    'The maximum number of variants shown in the comparison grid.'
+)
+
+
+def parse_variants(values):
+    """Returns the dict of the fixed parameters and the list of the varied parameters.
+       An entry like '8,16,32' or '8:32:8' has several values as in sweep.py.
+        Args:
+            values (dict): the values entered in the entry boxes.
+    """
+    fixed = {}
+    varied = []
+
+    for name, text in values.items():
+        if ',' in text or ':' in text:
+            varied.append(parse_param(f'{name}={text}'))
+        else:
+            fixed[name] = text
+
+    return fixed, varied
+
+
+def make_variant_grid(varied):
+    """Returns a list of rows of the grid; each row is a list of the dicts of the varied
+       parameters of the variants. The first parameter changes along the columns and
+       the second one along the rows.
+        Args:
+            varied (list): [(parameter name, [values]),,,,]; one or two parameters.
+    """
+    if len(varied) == 1:
+        (name, values), = varied
+        return [[{name: v} for v in values]]
+
+    (col_name, col_values), (row_name, row_values) = varied
+    return [[{col_name: c, row_name: r} for c in col_values] for r in row_values]
+
+
+class VariantGrid:
+    """Show variants of a shape side by side. The variants built with the same parameters
+       are instances of one model, and the distinct ones are built in worker processes in parallel.
+        Args:
+            parent (NodePath): the parent of the grid.
+            font (TextFont): the font of the labels.
+            find_cached_model (callable): returns the cached model of the params or None.
+            cache_model (callable): called with model_name, params, a built model and its bam stream.
+    """
+
+    def __init__(self, parent, font, find_cached_model, cache_model):
+        self.root = parent.attach_new_node('variants')
+        # The camera looks along (-1, 1, 0), so the grid faces it in the xz plane turned by 45 degrees.
+        self.root.set_h(45)
+        self.font = font
+        self.find_cached_model = find_cached_model
+        self.cache_model = cache_model
+        self.executor = None
+        self.futures = {}
+        self.masters = {}
+        self.cells = {}
+        self.shape = (0, 0)
+
+    @staticmethod
+    def make_key(params):
+        return tuple(sorted(params.items()))
+
+    def show(self, model_name, grid):
+        """Args:
+            model_name (str): a key of SHAPES.
+            grid (list): rows of (label, validated parameters or None if the variant cannot be built).
+        """
+        self.shape = (len(grid), max(len(row) for row in grid))
+
+        for (r, c), (label, params) in self.iter_cells(grid):
+            cell = self.root.attach_new_node(f'cell_{r}_{c}')
+            cell.set_python_tag('index', (r, c))
+            self.add_label(cell, label)
+
+            if params is None:
+                continue
+
+            key = self.make_key(params)
+            self.cells.setdefault(key, []).append(cell)
+
+            if key in self.masters or key in self.futures.values():
+                continue
+
+            if (model := self.find_cached_model(model_name, params)) is not None:
+                self.add_master(key, model)
+            else:
+                if self.executor is None:
+                    ctx = multiprocessing.get_context('spawn')
+                    self.executor = ProcessPoolExecutor(mp_context=ctx)
+
+                self.futures[self.executor.submit(build_model, model_name, params)] = key
+
+        self.layout()
+
+    def iter_cells(self, grid):
+        for r, row in enumerate(grid):
+            for c, item in enumerate(row):
+                yield (r, c), item
+
+    def add_label(self, cell, text):
+        text_node = TextNode('label')
+        text_node.set_text(text)
+        text_node.set_font(self.font)
+        text_node.set_align(TextNode.A_center)
+        text_node.set_text_color(LColor(1, 1, 1, 1))
+
+        label = cell.attach_new_node(text_node)
+        label.set_billboard_point_eye()
+        label.set_light_off()
+        label.set_name('label')
+
+    def add_master(self, key, model):
+        """Instance the model to all the cells of the variant."""
+        self.masters[key] = model
+
+        for cell in self.cells[key]:
+            model.instance_to(cell)
+
+    def mark_failed(self, key, error):
+        """Show the error under the labels of the cells of the variant.
+        """
+        for cell in self.cells[key]:
+            text_node = cell.find('label').node()
+            text_node.set_text(f'{text_node.get_text()}\nfailed: {error}')
+            text_node.set_text_color(LColor(1, 0.3, 0.3, 1))
+
+    def poll(self, model_name):
+        """Place the variants which have been built, and mark the ones which have failed.
+           Returns True if any cell has changed.
+        """
+        placed = False
+
+        for future in [f for f in self.futures if f.done()]:
+            key = self.futures.pop(future)
+
+            if (e := future.exception()) is not None:
+                self.mark_failed(key, f'{type(e).__name__}: {e}')
+                placed = True
+                continue
+
+            data = future.result()
+            model = decode_model(data)
+            self.cache_model(model_name, dict(key), model, data)
+            self.add_master(key, model)
+            self.layout()
+            placed = True
+
+        return placed
+
+    def layout(self):
+        """Arrange the cells at intervals wide enough for the largest variant,
+           and scale the grid to the size of a single model.
+        """
+        size = 2.0
+
+        for model in self.masters.values():
+            if (bounds := model.get_tight_bounds()) is not None:
+                low, high = bounds
+                size = max(size, (high - low).length())
+
+        rows, cols = self.shape
+        spacing = size * 1.2
+
+        for cell in self.root.get_children():
+            r, c = cell.get_python_tag('index')
+            cell.set_pos(Point3((c - (cols - 1) / 2) * spacing, 0, ((rows - 1) / 2 - r) * spacing))
+            cell.find('label').set_pos(Point3(0, 0, -size * 0.6))
+
+        self.root.set_scale(12 / (spacing * max(rows, cols)))
+
+    def rotate(self, dt):
+        for model in self.masters.values():
+            model.set_h(model.get_h() + 20 * dt)
+
+    def destroy(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+        self.root.remove_node()
@@ -0,0 +1,56 @@
+import numpy as np
+from panda3d.core import Geom
+
+
+NUMPY_TYPES = {
+    Geom.NT_uint8: np.uint8,
+    Geom.NT_uint16: np.uint16,
+    Geom.NT_uint32: np.uint32,
+    Geom.NT_int8: np.int8,
+    Geom.NT_int16: np.int16,
+    Geom.NT_int32: np.int32,
+    Geom.NT_float32: np.float32,
+    Geom.NT_float64: np.float64,
+}
+
+
+def get_rows(array):
+    """Returns a numpy view of the bytes of GeomVertexArrayData without copying,
+       whose shape is (the number of rows, stride).
+       The view is writable if the array is got by GeomVertexData.modify_array.
+    """
+    stride = array.get_array_format().get_stride()
+    buffer = np.asarray(memoryview(array).cast('B'))
+    return buffer.reshape(-1, stride)
+
+
+def get_column(vdata, name, writable=False):
+    """Returns a numpy view of the column, whose shape is (the number of rows, components),
+       or None if vdata does not have the column.
+        Args:
+            vdata (GeomVertexData): vertex data; must be modifiable if writable is True.
+            name (str): the column name, e.g. 'vertex', 'normal', 'texcoord'.
+    """
+    fmt = vdata.get_format()
+
+    if (array_index := fmt.get_array_with(name)) < 0:
+        return None
+
+    column = fmt.get_column(name)
+    array = vdata.modify_array(array_index) if writable else vdata.get_array(array_index)
+    rows = get_rows(array)
+    start = column.get_start()
+
+    return rows[:, start:start + column.get_total_bytes()].view(NUMPY_TYPES[column.get_numeric_type()])
+
+
+def get_indices(prim):
+    """Returns the vertex indices of the primitive as a numpy array.
+       A nonindexed primitive returns the sequential indices.
+    """
+    if not prim.is_indexed():
+        start = prim.get_first_vertex()
+        return np.arange(start, start + prim.get_num_vertices(), dtype=np.uint32)
+
+    array = prim.get_vertices()
+    return np.asarray(memoryview(array).cast('B')).view(NUMPY_TYPES[prim.get_index_type()])
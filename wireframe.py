@@ -0,0 +1,175 @@
+import numpy as np
+from panda3d.core import Geom, GeomNode, GeomTriangles, GeomVertexArrayFormat, GeomVertexData, GeomVertexFormat
+from panda3d.core import CompassEffect, ConfigVariableColor, ConfigVariableDouble, LColor, NodePath, Shader
+from panda3d.core import TransparencyAttrib
+
+from geom_stats import iter_geom_nodes
+from vertex_arrays import get_column, get_indices, get_rows
+
+
+wireframe_color = ConfigVariableColor(
+    'wireframe-color', LColor(1, 1, 1, 1),
+    'The color of the edges drawn over the model.'
+)
+
+wireframe_width = ConfigVariableDouble(
+    'wireframe-width', 1.0,
+    'The width in pixels of the edges drawn over the model.'
+)
+
+
+VERT_SHADER = """
+#version 150
+
+uniform mat4 p3d_ModelViewProjectionMatrix;
+
+in vec4 p3d_Vertex;
+in vec3 barycentric;
+
+out vec3 v_barycentric;
+
+void main() {
+    gl_Position = p3d_ModelViewProjectionMatrix * p3d_Vertex;
+    v_barycentric = barycentric;
+}
+"""
+
+FRAG_SHADER = """
+#version 150
+
+uniform vec4 wire_color;
+uniform float wire_width;
+
+in vec3 v_barycentric;
+
+out vec4 p3d_FragColor;
+
+void main() {
+    // The distance in pixels to the nearest edge, from the screen-space derivatives.
+    vec3 d = v_barycentric / max(fwidth(v_barycentric), vec3(1e-6));
+    float edge = 1.0 - clamp(min(min(d.x, d.y), d.z) - wire_width * 0.5 + 0.5, 0.0, 1.0);
+    float alpha = edge * wire_color.a;
+
+    if (alpha < 0.01) {
+        discard;
+    }
+    p3d_FragColor = vec4(wire_color.rgb, alpha);
+}
+"""
+
+
+def make_overlay_format():
+    """Returns the format of the overlay: float32 positions and the barycentric
+       coordinates of the triangle corners, stored as uint8 (0 or 1) padded to 4 bytes.
+    """
+    array_format = GeomVertexArrayFormat()
+    array_format.add_column('vertex', 3, Geom.NT_float32, Geom.C_point)
+    array_format.add_column('barycentric', 4, Geom.NT_uint8, Geom.C_other)
+    return GeomVertexFormat.register_format(GeomVertexFormat(array_format))
+
+
+def make_overlay_geom(geom, fmt):
+    """Returns a nonindexed Geom which has the triangles of the geom with
+       their own three vertices, or None if the geom has no triangles.
+    """
+    triangles = [get_indices(prim.decompose()) for prim in geom.get_primitives()
+                 if prim.get_primitive_type() == Geom.PT_polygons]
+
+    if not triangles or not (indices := np.concatenate(triangles)).size:
+        return None
+
+    vertices = get_column(geom.get_vertex_data(), 'vertex')[indices, :3]
+
+    vdata = GeomVertexData('wireframe', fmt, Geom.UH_static)
+    vdata.unclean_set_num_rows(len(indices))
+    rows = get_rows(vdata.modify_array(0))
+    rows[:, :12] = vertices.astype(np.float32).view(np.uint8)
+    rows[:, 12:] = np.tile(np.eye(3, 4, dtype=np.uint8), (len(indices) // 3, 1))
+
+    prim = GeomTriangles(Geom.UH_static)
+    prim.add_next_vertices(len(indices))
+
+    new_geom = Geom(vdata)
+    new_geom.add_primitive(prim)
+    return new_geom
+
+
+def make_overlay(model):
+    """Returns a NodePath which has the triangles of the model with the barycentric coordinates.
+       The transforms of the GeomNodes relative to the model are kept.
+        Args:
+            model (NodePath): a model created by shapes.
+    """
+    fmt = make_overlay_format()
+    overlay = NodePath('wireframe')
+
+    for node in iter_geom_nodes(model):
+        geom_node = GeomNode(node.get_name())
+
+        for geom in node.get_geoms():
+            if (new_geom := make_overlay_geom(geom, fmt)) is not None:
+                geom_node.add_geom(new_geom)
+
+        geom_np = overlay.attach_new_node(geom_node)
+
+        if node != model.node():
+            geom_np.set_transform(NodePath(node).get_transform(model))
+
+    return overlay
+
+
+class WireframeOverlay:
+    """Draw the edges of the model over its filled surface with a shader. The overlay is
+       created when the edges are shown first for the attached model, and hidden, not drawn,
+       while the edges are turned off.
+        Args:
+            parent (NodePath): the parent of the overlay, usually render.
+    """
+
+    def __init__(self, parent, visible=True):
+        self.parent = parent
+        self.visible = visible
+        self.model = None
+        self.overlay = None
+        self.shader = Shader.make(Shader.SL_GLSL, VERT_SHADER, FRAG_SHADER)
+
+    def attach(self, model):
+        """Draw the edges of the model. The overlay follows the transform of the model.
+        """
+        self.detach()
+        self.model = model
+
+        if self.visible:
+            self.create_overlay()
+
+    def create_overlay(self):
+        self.overlay = make_overlay(self.model)
+        self.overlay.reparent_to(self.parent)
+        self.overlay.set_effect(CompassEffect.make(self.model, CompassEffect.P_all))
+
+        self.overlay.set_shader(self.shader)
+        self.overlay.set_shader_input('wire_color', wireframe_color.get_value())
+        self.overlay.set_shader_input('wire_width', wireframe_width.get_value())
+        self.overlay.set_transparency(TransparencyAttrib.M_alpha)
+        self.overlay.set_depth_write(False)
+        # Drawn over the surface at the same depth without z-fighting.
+        self.overlay.set_depth_offset(1)
+        self.overlay.set_light_off()
+
+    def detach(self):
+        if self.overlay is not None:
+            self.overlay.remove_node()
+            self.overlay = None
+
+        self.model = None
+
+    def set_visible(self, visible):
+        self.visible = visible
+
+        if self.overlay is not None:
+            if visible:
+                self.overlay.show()
+            else:
+                self.overlay.hide()
+        elif visible and self.model is not None:
+            self.create_overlay()